@@ -1,29 +1,61 @@
 import math
-from copy import copy
+from collections import OrderedDict
+from collections.abc import Iterator
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class CellBoundary:
     start_lat: float    # North side
     end_lat: float      # South side
     start_lon: float    # West side
     end_lon: float      # East side
 
-@dataclass
+@dataclass(slots=True)
 class CellIndices:
     # Increasing row index is northward. Rows run latitudinal
     row_index: int
     # Increasing col index is eastward. Cols run longitudinal
     col_index: int
 
-@dataclass
+@dataclass(slots=True)
 class Coordinates:
     lat: float
     lon: float
 
+@dataclass(slots=True)
+class CellIndexRange:
+    # Inclusive range of rows. Rows do not wrap at the poles
+    row_start: int
+    row_end: int
+    # Cols col_start, col_start + 1, ... col_start + col_count - 1, wrapping eastward across the antimeridian
+    col_start: int
+    col_count: int
+
+@dataclass(slots=True)
+class CircleCells:
+    cells: list[int]
+    # Cells of the circle's bounding rectangle that were dropped for lying entirely outside the circle
+    pruned_count: int
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
 EARTH_RADIUS_KM = 6371
 
+# Slack for floating point error when comparing a distance against a radius, so cells touching the circle are never dropped
+_DISTANCE_EPSILON_KM = 1e-9
+
+# Up to this precision cell bounds are computed from the row and col indices rather than bit by bit
+_MAX_INDEX_BOUNDS_PRECISION = 64
+
 def calc_geohash(point: Coordinates, precision: int):
+    return calc_geohash_lat_lon(point.lat, point.lon, precision)
+
+def calc_geohash_lat_lon(lat: float, lon: float, precision: int) -> int:
     lat_min = -90
     lat_max = 90
     lon_min = -180
@@ -36,7 +68,7 @@ def calc_geohash(point: Coordinates, precision: int):
         if is_col_bit:
             # Divide left-right
             lon_mid = (lon_min + lon_max) / 2
-            if point.lon >= lon_mid:
+            if lon >= lon_mid:
                 new_bit = 1
                 lon_min = lon_mid
             else:
@@ -45,7 +77,7 @@ def calc_geohash(point: Coordinates, precision: int):
         else:
             # Divide up-down
             lat_mid = (lat_min + lat_max) / 2
-            if point.lat >= lat_mid:
+            if lat >= lat_mid:
                 new_bit = 1
                 lat_min = lat_mid
             else:
@@ -55,6 +87,25 @@ def calc_geohash(point: Coordinates, precision: int):
     return geohash
 
 def calc_cell_boundary(cell_geohash: int, precision: int) -> CellBoundary:
+    start_lat, end_lat, start_lon, end_lon = calc_cell_bounds(cell_geohash, precision)
+    return CellBoundary(
+        start_lat=start_lat,
+        end_lat=end_lat,
+        start_lon=start_lon,
+        end_lon=end_lon,
+    )
+
+def calc_cell_bounds(cell_geohash: int, precision: int) -> tuple[float, float, float, float]:
+    '''
+    Same as `calc_cell_boundary`, returning a plain (start_lat, end_lat, start_lon, end_lon) tuple.
+    '''
+    if precision <= _MAX_INDEX_BOUNDS_PRECISION:
+        # Every bisection midpoint is a multiple of the cell size, so the bounds are exact multiples of it too
+        row_index, col_index = geohash_to_row_col(cell_geohash, precision)
+        lat_step = 180 / (1 << (precision // 2))
+        lon_step = 360 / (1 << ((precision + 1) // 2))
+        return -90 + row_index * lat_step, -90 + (row_index + 1) * lat_step, -180 + col_index * lon_step, -180 + (col_index + 1) * lon_step
+
     lat_min = -90
     lat_max = 90
     lon_min = -180
@@ -81,12 +132,7 @@ def calc_cell_boundary(cell_geohash: int, precision: int) -> CellBoundary:
                 lat_max = lat_mid
         is_col_bit = not is_col_bit
 
-    return CellBoundary(
-        start_lat=lat_min,
-        end_lat=lat_max,
-        start_lon=lon_min,
-        end_lon=lon_max,
-    )
+    return lat_min, lat_max, lon_min, lon_max
 
 
 def is_west_of(origin_point_lon: float, boundary_point_lon: float, test_point_lon) -> bool:
@@ -108,118 +154,627 @@ def calc_cells_within_radius(point: Coordinates, precision: int, radius: float)
     This calculates a rectangular boundary around `coords` with dimensions 2*radius by 2*radius.
     Any cell that overlaps this rectanglar boundary is returned.
     A rectangular boundary is used for simplicity, rather than a circular one.
+    See `calc_cells_within_circle` for a cover that drops the cells outside the circle.
+    See `iter_cells_within_radius` to stream the cells instead of building the whole list.
 
     '''
-    ghash = calc_geohash(point, precision)
-    ghashes = [ghash]
-    ew_hashes = [ghash]
-    boundary: CellBoundary = calc_cell_boundary(ghash, precision)
-
-    west_point = displace_point(point, radius, 1.5 * math.pi)
-    current_cell_hash = ghash
-    while is_west_of(point.lon, boundary.start_lon, west_point.lon):
-        neighbor_cell_hash = displace_cell(current_cell_hash, precision, 0, -1)
-        neighbor_cell_boundary = calc_cell_boundary(neighbor_cell_hash, precision)
-        boundary.start_lon = neighbor_cell_boundary.start_lon
-        ghashes.append(neighbor_cell_hash)
-        ew_hashes.append(neighbor_cell_hash)
-        current_cell_hash = neighbor_cell_hash
-
-    east_point = displace_point(point, radius, math.pi / 2)
-    current_cell_hash = ghash
-    while is_east_of(point.lon, boundary.end_lon, east_point.lon):
-        neighbor_cell_hash = displace_cell(current_cell_hash, precision, 0, 1)
-        neighbor_cell_boundary = calc_cell_boundary(neighbor_cell_hash, precision)
-        boundary.end_lon = neighbor_cell_boundary.end_lon
-        ghashes.append(neighbor_cell_hash)
-        ew_hashes.append(neighbor_cell_hash)
-        current_cell_hash = neighbor_cell_hash
-
-    north_point = displace_point(point, radius, 0)
-    current_ew_hashes = copy(ew_hashes)
-    while north_point.lat > boundary.end_lat:
-        new_ew_hashes = []
-        for ew_hash in current_ew_hashes:
-            neighbor_cell_hash = displace_cell(ew_hash, precision, 1, 0)
-            ghashes.append(neighbor_cell_hash)
-            new_ew_hashes.append(neighbor_cell_hash)
-
-        neighbor_cell_boundary = calc_cell_boundary(new_ew_hashes[0], precision)
-        boundary.end_lat = neighbor_cell_boundary.end_lat
-        current_ew_hashes = new_ew_hashes
-
-    south_point = displace_point(point, radius, math.pi)
-    current_ew_hashes = copy(ew_hashes)
-    while south_point.lat < boundary.start_lat:
-        new_ew_hashes = []
-        for ew_hash in current_ew_hashes:
-            neighbor_cell_hash = displace_cell(ew_hash, precision, -1, 0)
-            ghashes.append(neighbor_cell_hash)
-            new_ew_hashes.append(neighbor_cell_hash)
-
-        neighbor_cell_boundary = calc_cell_boundary(new_ew_hashes[0], precision)
-        boundary.start_lat = neighbor_cell_boundary.start_lat
-        current_ew_hashes = new_ew_hashes
-
-    return ghashes
+    return list(iter_cells_within_radius(point, precision, radius))
 
-def geohash_to_cell_indices(geohash: int, precision: int) -> CellIndices:
-    row_index = 0
-    col_index = 0
+# Set by `geohash_profile.profile_radius_queries` while radius queries are profiled
+_radius_query_profiler = None
 
-    is_col_index = True
-    for i in range(precision-1, -1, -1):
-        bit: bool = (geohash & (1 << i)) != 0
-        if bit:
-            if is_col_index:
-                col_index = col_index | (1 << (i // 2))
-            else:
-                row_index = row_index | (1 << (i // 2))
-        is_col_index = not is_col_index
+def iter_cells_within_radius(point: Coordinates, precision: int, radius: float) -> Iterator[int]:
+    '''
+    Lazily yield the cells of `calc_cells_within_radius`, in the same order.
 
-    return CellIndices(row_index=row_index, col_index=col_index)
+    The center row is yielded first, then the rows to the north, then the rows to the south.
+    Only the cols of the center row are held in memory.
+    Inside `geohash_profile.profile_radius_queries`, the work done in each of these phases is recorded.
+    '''
+    profiler = _radius_query_profiler
+    if profiler is not None:
+        profiler.start_query(point, precision, radius)
+
+    ghash = calc_geohash_lat_lon(point.lat, point.lon, precision)
+    yield ghash
+    start_lat, end_lat, start_lon, end_lon = calc_cell_bounds(ghash, precision)
+
+    # Every row has the same cols as the center row, so each cell is the OR of its row's bits and its col's bits
+    origin_row, origin_col = geohash_to_row_col(ghash, precision)
+    ew_col_bits = [_col_geohash_bits(origin_col, precision)]
+    origin_row_bits = _row_geohash_bits(origin_row, precision)
+    # At coarse precisions the walks can wrap around the globe, so stop them once the row holds every col
+    col_count = 1 << ((precision + 1) // 2)
+    if profiler is not None:
+        profiler.end_phase('center', iterations=1, decode_calls=1, cells=1)
+
+    _, west_lon = displace_lat_lon(point.lat, point.lon, radius, 1.5 * math.pi)
+    col = origin_col
+    while len(ew_col_bits) < col_count and is_west_of(point.lon, start_lon, west_lon):
+        col -= 1
+        col_bits = _col_geohash_bits(col, precision)
+        neighbor_cell_hash = origin_row_bits | col_bits
+        _, _, start_lon, _ = calc_cell_bounds(neighbor_cell_hash, precision)
+        yield neighbor_cell_hash
+        ew_col_bits.append(col_bits)
+    if profiler is not None:
+        profiler.end_phase('west', iterations=origin_col - col, decode_calls=origin_col - col, cells=origin_col - col)
+
+    _, east_lon = displace_lat_lon(point.lat, point.lon, radius, math.pi / 2)
+    col = origin_col
+    while len(ew_col_bits) < col_count and is_east_of(point.lon, end_lon, east_lon):
+        col += 1
+        col_bits = _col_geohash_bits(col, precision)
+        neighbor_cell_hash = origin_row_bits | col_bits
+        _, _, _, end_lon = calc_cell_bounds(neighbor_cell_hash, precision)
+        yield neighbor_cell_hash
+        ew_col_bits.append(col_bits)
+    if profiler is not None:
+        profiler.end_phase('east', iterations=col - origin_col, decode_calls=col - origin_col, cells=col - origin_col)
+
+    north_lat, _ = displace_lat_lon(point.lat, point.lon, radius, 0)
+    row = origin_row
+    while north_lat > end_lat:
+        row += 1
+        row_bits = _row_geohash_bits(row, precision)
+        for col_bits in ew_col_bits:
+            yield row_bits | col_bits
+
+        _, end_lat, _, _ = calc_cell_bounds(row_bits | ew_col_bits[0], precision)
+    if profiler is not None:
+        profiler.end_phase('north', iterations=row - origin_row, decode_calls=row - origin_row, cells=(row - origin_row) * len(ew_col_bits))
+
+    south_lat, _ = displace_lat_lon(point.lat, point.lon, radius, math.pi)
+    row = origin_row
+    while south_lat < start_lat:
+        row -= 1
+        row_bits = _row_geohash_bits(row, precision)
+        for col_bits in ew_col_bits:
+            yield row_bits | col_bits
+
+        start_lat, _, _, _ = calc_cell_bounds(row_bits | ew_col_bits[0], precision)
+    if profiler is not None:
+        profiler.end_phase('south', iterations=origin_row - row, decode_calls=origin_row - row, cells=(origin_row - row) * len(ew_col_bits))
+        profiler.end_query()
+
+def _spread_bits(value: int) -> int:
+    # Spread each bit of `value` into the even bit positions of the result, 32 bits at a time.
+    result = 0
+    shift = 0
+    while value:
+        x = value & 0xFFFFFFFF
+        x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+        x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+        x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+        x = (x | (x << 2)) & 0x3333333333333333
+        x = (x | (x << 1)) & 0x5555555555555555
+        result |= x << shift
+        value >>= 32
+        shift += 64
+    return result
+
+def _compact_bits(value: int) -> int:
+    # Inverse of `_spread_bits`: gather the even bit positions of `value`, 64 bits at a time.
+    result = 0
+    shift = 0
+    while value:
+        x = value & 0x5555555555555555
+        x = (x | (x >> 1)) & 0x3333333333333333
+        x = (x | (x >> 2)) & 0x0F0F0F0F0F0F0F0F
+        x = (x | (x >> 4)) & 0x00FF00FF00FF00FF
+        x = (x | (x >> 8)) & 0x0000FFFF0000FFFF
+        x = (x | (x >> 16)) & 0xFFFFFFFF
+        result |= x << shift
+        value >>= 64
+        shift += 32
+    return result
+
+def geohash_to_row_col(geohash: int, precision: int) -> tuple[int, int]:
+    '''
+    Same as `geohash_to_cell_indices`, returning a plain (row_index, col_index) tuple.
 
-def cell_indices_to_geohash(cell_indices: CellIndices, precision: int) -> int:
-    geohash = 0
+    The first (most significant) bit is always a col bit, so col bits sit on the odd
+    positions for an even precision and on the even positions for an odd precision.
+    '''
+    geohash &= (1 << precision) - 1
+    if precision % 2 == 0:
+        return _compact_bits(geohash), _compact_bits(geohash >> 1)
+    return _compact_bits(geohash >> 1), _compact_bits(geohash)
 
-    is_col_index = True
-    for i in range(precision-1, -1, -1):
-        if is_col_index:
-            if cell_indices.col_index & (1 << (i // 2)):
-                geohash = geohash | (1 << i)
-        else:
-            if cell_indices.row_index & (1 << (i // 2)):
-                geohash = geohash | (1 << i)
-        is_col_index = not is_col_index
+def row_col_to_geohash(row_index: int, col_index: int, precision: int) -> int:
+    '''
+    Same as `cell_indices_to_geohash`, taking plain ints.
 
-    return geohash
+    Indices outside the grid wrap around, e.g. a col index of -1 is the eastmost column.
+    '''
+    return _row_geohash_bits(row_index, precision) | _col_geohash_bits(col_index, precision)
 
-def displace_cell(geohash: int, precision: int, row_offset: int, col_offset: int) -> int:
-    cell_indices: CellIndices = geohash_to_cell_indices(geohash, precision)
+def _row_geohash_bits(row_index: int, precision: int) -> int:
+    # The row bits of the geohash, to be OR-ed with the col bits from `_col_geohash_bits`
+    row_bits = _spread_bits(row_index & ((1 << (precision // 2)) - 1))
+    return row_bits if precision % 2 == 0 else row_bits << 1
+
+def _col_geohash_bits(col_index: int, precision: int) -> int:
+    col_bits = _spread_bits(col_index & ((1 << ((precision + 1) // 2)) - 1))
+    return col_bits << 1 if precision % 2 == 0 else col_bits
 
-    new_cell_indices = CellIndices(row_index=cell_indices.row_index + row_offset, col_index=cell_indices.col_index + col_offset)
+def geohash_to_cell_indices(geohash: int, precision: int) -> CellIndices:
+    row_index, col_index = geohash_to_row_col(geohash, precision)
+    return CellIndices(row_index=row_index, col_index=col_index)
 
-    return cell_indices_to_geohash(new_cell_indices, precision)
+def cell_indices_to_geohash(cell_indices: CellIndices, precision: int) -> int:
+    return row_col_to_geohash(cell_indices.row_index, cell_indices.col_index, precision)
+
+def displace_cell(geohash: int, precision: int, row_offset: int, col_offset: int) -> int:
+    row_index, col_index = geohash_to_row_col(geohash, precision)
+    return row_col_to_geohash(row_index + row_offset, col_index + col_offset, precision)
+
+def displace_row_col(row_col: tuple[int, int], precision: int, row_offset: int, col_offset: int) -> tuple[int, int]:
+    '''
+    Same as `displace_cell`, working directly on (row_index, col_index) tuples, with the same wrapping.
+    '''
+    row_index, col_index = row_col
+    row_index = (row_index + row_offset) & ((1 << (precision // 2)) - 1)
+    col_index = (col_index + col_offset) & ((1 << ((precision + 1) // 2)) - 1)
+    return row_index, col_index
 
 def displace_point(start_point: Coordinates, offset_km: float, angle_from_n_rad: float) -> Coordinates:
+    dest_lat, dest_lon = displace_lat_lon(start_point.lat, start_point.lon, offset_km, angle_from_n_rad)
+    return Coordinates(lat=dest_lat, lon=dest_lon)
+
+def displace_lat_lon(start_lat: float, start_lon: float, offset_km: float, angle_from_n_rad: float) -> tuple[float, float]:
     # See http://www.movable-type.co.uk/scripts/latlong.html
     angular_distance = offset_km / EARTH_RADIUS_KM
-    dest_lat_rad = math.asin(math.sin(math.radians(start_point.lat)) * math.cos(angular_distance) + math.cos(math.radians(start_point.lat)) * math.sin(angular_distance) * math.cos(angle_from_n_rad))
+    start_lat_rad = math.radians(start_lat)
+    dest_lat_rad = math.asin(math.sin(start_lat_rad) * math.cos(angular_distance) + math.cos(start_lat_rad) * math.sin(angular_distance) * math.cos(angle_from_n_rad))
 
-    dest_lon_rad = math.radians(start_point.lon) + math.atan2(
-        math.sin(angle_from_n_rad) * math.sin(angular_distance) * math.cos(math.radians(start_point.lat)),
-        math.cos(angular_distance) - math.sin(math.radians(start_point.lat)) * math.sin(dest_lat_rad)
+    dest_lon_rad = math.radians(start_lon) + math.atan2(
+        math.sin(angle_from_n_rad) * math.sin(angular_distance) * math.cos(start_lat_rad),
+        math.cos(angular_distance) - math.sin(start_lat_rad) * math.sin(dest_lat_rad)
     )
 
-    dest_lat = math.degrees(dest_lat_rad)
-    dest_lon = math.degrees(dest_lon_rad)
-
-    return Coordinates(lat=dest_lat, lon=dest_lon)
+    return math.degrees(dest_lat_rad), math.degrees(dest_lon_rad)
 
 def calc_distance_km(point1: Coordinates, point2: Coordinates) -> float:
+    return calc_distance_km_lat_lon(point1.lat, point1.lon, point2.lat, point2.lon)
+
+def calc_distance_km_lat_lon(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     # See http://www.movable-type.co.uk/scripts/latlong.html
-    delta_lat = math.radians(point2.lat - point1.lat)
-    delta_lon = math.radians(point2.lon - point1.lon)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
 
-    a = math.pow(math.sin(delta_lat / 2), 2) + math.cos(math.radians(point1.lat)) * math.cos(math.radians(point2.lat)) * math.pow(math.sin(delta_lon / 2), 2)
+    a = math.pow(math.sin(delta_lat / 2), 2) + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.pow(math.sin(delta_lon / 2), 2)
     return 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)) * EARTH_RADIUS_KM
+
+def _normalize_lon(lon: float) -> float:
+    return (lon + 180) % 360 - 180
+
+def _calc_min_distance_to_bounds(lat: float, lon: float, start_lat: float, end_lat: float, start_lon: float, end_lon: float) -> float:
+    # For a fixed latitude the distance grows with the longitude difference, so the nearest point
+    # of the cell lies on its nearest meridian edge (or on the point's own meridian if it is inside the
+    # cell's longitudes). Along a meridian, the distance has a single minimum at `peak_lat`.
+    # Longitudes are compared modulo 360, so `end_lon` may run past 180 for ranges crossing the antimeridian.
+    width = end_lon - start_lon
+    offset = (lon - start_lon) % 360
+    if offset <= width:
+        delta_lon = 0
+    else:
+        delta_lon = min(offset - width, 360 - offset)
+
+    if delta_lon == 0:
+        nearest_lat = min(max(lat, start_lat), end_lat)
+        return calc_distance_km_lat_lon(lat, lon, nearest_lat, lon)
+
+    lat_rad = math.radians(lat)
+    peak_lat = math.degrees(math.atan2(math.sin(lat_rad), math.cos(lat_rad) * math.cos(math.radians(delta_lon))))
+    return min(
+        calc_distance_km_lat_lon(lat, lon, edge_lat, lon + delta_lon)
+        for edge_lat in (start_lat, end_lat, min(max(peak_lat, start_lat), end_lat))
+    )
+
+def calc_min_distance_to_cell_km(point: Coordinates, cell_geohash: int, precision: int) -> float:
+    '''
+    Calculate the great-circle distance from `point` to the nearest point of the cell. Zero if the point is inside the cell.
+    '''
+    return calc_min_distance_to_boundary_km(point, calc_cell_boundary(cell_geohash, precision))
+
+def calc_min_distance_to_boundary_km(point: Coordinates, boundary: CellBoundary) -> float:
+    '''
+    Calculate the great-circle distance from `point` to the nearest point of the lat/lon rectangle `boundary`.
+
+    `boundary.end_lon` may exceed 180 for a rectangle crossing the antimeridian.
+    '''
+    return _calc_min_distance_to_bounds(point.lat, point.lon, boundary.start_lat, boundary.end_lat, boundary.start_lon, boundary.end_lon)
+
+def calc_cap_index_range(point: Coordinates, precision: int, radius: float) -> CellIndexRange:
+    '''
+    Calculate the range of cells overlapping the smallest lat/lon rectangle containing every point within radius km of `point`.
+
+    Unlike the rectangle used by `calc_cells_within_radius`, this accounts for the circle bulging
+    further east and west than the points due east and west of `point` away from the equator.
+    '''
+    col_count = 1 << ((precision + 1) // 2)
+    angular_distance = radius / EARTH_RADIUS_KM
+    angular_distance_deg = math.degrees(angular_distance)
+
+    south_row, _ = geohash_to_row_col(calc_geohash_lat_lon(max(point.lat - angular_distance_deg, -90), 0, precision), precision)
+    north_row, _ = geohash_to_row_col(calc_geohash_lat_lon(min(point.lat + angular_distance_deg, 90), 0, precision), precision)
+
+    # See http://www.movable-type.co.uk/scripts/latlong-db.html
+    cos_lat = math.cos(math.radians(point.lat))
+    if point.lat + angular_distance_deg >= 90 or point.lat - angular_distance_deg <= -90 or math.sin(angular_distance) >= cos_lat:
+        # The circle covers a pole, so it covers every longitude
+        return CellIndexRange(row_start=south_row, row_end=north_row, col_start=0, col_count=col_count)
+
+    delta_lon = math.degrees(math.asin(math.sin(angular_distance) / cos_lat))
+    if delta_lon >= 180:
+        return CellIndexRange(row_start=south_row, row_end=north_row, col_start=0, col_count=col_count)
+
+    _, west_col = geohash_to_row_col(calc_geohash_lat_lon(0, _normalize_lon(point.lon - delta_lon), precision), precision)
+    _, east_col = geohash_to_row_col(calc_geohash_lat_lon(0, _normalize_lon(point.lon + delta_lon), precision), precision)
+    cols = (east_col - west_col) % col_count + 1
+    return CellIndexRange(row_start=south_row, row_end=north_row, col_start=west_col, col_count=cols)
+
+def calc_cells_within_circle(point: Coordinates, precision: int, radius: float) -> CircleCells:
+    '''
+    Calculate the geohashes of the cells that contain points within radius km of `point`.
+
+    Starts from the cells of `calc_cap_index_range` and drops every cell whose nearest point is more than
+    radius km from `point`, using the same great-circle distance as `calc_distance_km`.
+    No cell overlapping the circle is dropped. Cells are ordered by row, south to north, then west to east.
+    '''
+    index_range = calc_cap_index_range(point, precision, radius)
+    col_count = 1 << ((precision + 1) // 2)
+    lat_step = 180 / (1 << (precision // 2))
+    lon_step = 360 / col_count
+    _, center_col = geohash_to_row_col(calc_geohash(point, precision), precision)
+
+    def is_within(row_start_lat: float, col: int) -> bool:
+        start_lon = -180 + (col % col_count) * lon_step
+        distance = _calc_min_distance_to_bounds(point.lat, point.lon, row_start_lat, row_start_lat + lat_step, start_lon, start_lon + lon_step)
+        return distance <= radius + _DISTANCE_EPSILON_KM
+
+    cells = []
+    pruned_count = 0
+    for row in range(index_range.row_start, index_range.row_end + 1):
+        row_start_lat = -90 + row * lat_step
+        # Within a row the distance grows with the longitude difference, so the kept cells are the
+        # contiguous run of cols around the point's own col.
+        if not is_within(row_start_lat, center_col):
+            pruned_count += index_range.col_count
+            continue
+        east = 0
+        while east + 1 < col_count and is_within(row_start_lat, center_col + east + 1):
+            east += 1
+        west = 0
+        while west + east + 1 < col_count and is_within(row_start_lat, center_col - west - 1):
+            west += 1
+        for col in range(center_col - west, center_col + east + 1):
+            cells.append(row_col_to_geohash(row, col, precision))
+        pruned_count += max(index_range.col_count - (west + east + 1), 0)
+
+    return CircleCells(cells=cells, pruned_count=pruned_count)
+
+def cells_to_ranges(cells: list[int], max_ranges: int | None = None) -> list[tuple[int, int]]:
+    '''
+    Coalesce cell geohashes into sorted, non-overlapping [lo, hi) geohash ranges.
+
+    Cells adjacent in Z-order are merged, so a fully covered parent cell becomes a single range.
+    If `max_ranges` is given and more ranges are needed, the ranges separated by the smallest gaps
+    are merged, which covers the fewest extra cells for that number of ranges.
+    '''
+    if max_ranges is not None and max_ranges < 1:
+        raise ValueError(f'max_ranges must be at least 1, got {max_ranges}')
+
+    ranges = []
+    for cell in sorted(set(cells)):
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1][1] = cell + 1
+        else:
+            ranges.append([cell, cell + 1])
+
+    if max_ranges is not None and len(ranges) > max_ranges:
+        gaps = sorted(range(len(ranges) - 1), key=lambda i: (ranges[i + 1][0] - ranges[i][1], i))
+        kept_gaps = sorted(gaps[len(gaps) - (max_ranges - 1):]) if max_ranges > 1 else []
+        merged = []
+        start = 0
+        for i in kept_gaps + [len(ranges) - 1]:
+            merged.append([ranges[start][0], ranges[i][1]])
+            start = i + 1
+        ranges = merged
+
+    return [(lo, hi) for lo, hi in ranges]
+
+def calc_ranges_within_radius(point: Coordinates, precision: int, radius: float, max_ranges: int | None = None, storage_precision: int | None = None) -> list[tuple[int, int]]:
+    '''
+    Calculate [lo, hi) geohash ranges covering every cell that contains points within radius km of `point`.
+
+    The cells are those of `calc_cells_within_circle`, coalesced by `cells_to_ranges`.
+    If the store keys rows by geohashes of a finer `storage_precision`, the ranges are scaled to that precision.
+    '''
+    cells = calc_cells_within_circle(point, precision, radius).cells
+    ranges = cells_to_ranges(cells, max_ranges)
+    if storage_precision is not None:
+        if storage_precision < precision:
+            raise ValueError(f'storage_precision {storage_precision} is coarser than precision {precision}')
+        shift = storage_precision - precision
+        ranges = [(lo << shift, hi << shift) for lo, hi in ranges]
+    return ranges
+
+def calc_cells_within_radius_of_cell(cell_geohash: int, precision: int, radius: float) -> list[int]:
+    '''
+    Calculate the geohashes of the cells that contain points within radius km of any point of the given cell.
+
+    Uses the circle around the cell's center, widened by the distance from the center to the cell's farthest corner.
+    '''
+    boundary: CellBoundary = calc_cell_boundary(cell_geohash, precision)
+    center = Coordinates(lat=(boundary.start_lat + boundary.end_lat) / 2, lon=(boundary.start_lon + boundary.end_lon) / 2)
+    # For a fixed latitude the farthest point of the cell is on its east or west edge, and along
+    # either edge the distance is largest at one of the ends, so the farthest point is a corner.
+    center_to_corner = max(
+        calc_distance_km(center, Coordinates(lat=lat, lon=boundary.start_lon))
+        for lat in (boundary.start_lat, boundary.end_lat)
+    )
+    return calc_cells_within_circle(center, precision, radius + center_to_corner).cells
+
+class RadiusQueryCache:
+    '''
+    Bounded LRU cache of radius queries, keyed by the cell containing the query point, the precision and the radius.
+
+    Cached covers come from `calc_cells_within_radius_of_cell`, so they hold every cell within radius km
+    of any point in the origin cell. That is a superset of `calc_cells_within_circle` for the query point.
+    '''
+    def __init__(self, max_size: int = 4096):
+        if max_size < 1:
+            raise ValueError(f'max_size must be at least 1, got {max_size}')
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[int, int, float], tuple[int, ...]] = OrderedDict()
+        self._stats = CacheStats()
+
+    def get_cells(self, point: Coordinates, precision: int, radius: float) -> tuple[int, ...]:
+        key = (calc_geohash(point, precision), precision, radius)
+        cells = self._entries.get(key)
+        if cells is not None:
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return cells
+
+        self._stats.misses += 1
+        cells = tuple(calc_cells_within_radius_of_cell(key[0], precision, radius))
+        self._entries[key] = cells
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+        return cells
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._stats.hits,
+            misses=self._stats.misses,
+            evictions=self._stats.evictions,
+            size=len(self._entries),
+        )
+
+    def clear(self):
+        self._entries.clear()
+        self._stats = CacheStats()
+
+def calc_bbox_index_range(south_west: Coordinates, north_east: Coordinates, precision: int) -> CellIndexRange:
+    '''
+    Calculate the range of cells overlapping the box between `south_west` and `north_east`.
+
+    If `south_west` is east of `north_east`, the box crosses the antimeridian.
+    '''
+    col_count = 1 << ((precision + 1) // 2)
+    south_row, west_col = geohash_to_row_col(calc_geohash(south_west, precision), precision)
+    north_row, east_col = geohash_to_row_col(calc_geohash(north_east, precision), precision)
+    cols = (east_col - west_col) % col_count + 1
+    if south_west.lon > north_east.lon and cols == 1:
+        cols = col_count
+    return CellIndexRange(row_start=south_row, row_end=north_row, col_start=west_col, col_count=cols)
+
+def calc_cells_in_index_range(index_range: CellIndexRange, precision: int) -> list[int]:
+    return [
+        row_col_to_geohash(row, index_range.col_start + col_offset, precision)
+        for row in range(index_range.row_start, index_range.row_end + 1)
+        for col_offset in range(index_range.col_count)
+    ]
+
+def calc_cells_within_bbox(south_west: Coordinates, north_east: Coordinates, precision: int) -> list[int]:
+    return calc_cells_in_index_range(calc_bbox_index_range(south_west, north_east, precision), precision)
+
+@dataclass(slots=True)
+class CoverDelta:
+    added: list[int]
+    removed: list[int]
+
+def _index_range_cols(index_range: CellIndexRange, col_count: int) -> set[int]:
+    return {(index_range.col_start + col_offset) % col_count for col_offset in range(index_range.col_count)}
+
+class RadiusCoverTracker:
+    '''
+    Tracks the cells within radius km of a moving point, reporting only the cells that change on each move.
+
+    The cover is the cells of `calc_cap_index_range`: a rectangle of rows and cols containing the circle.
+    Moves are diffed on the rows and cols of the old and new rectangles, so only cells entering or
+    leaving the cover are ever computed.
+    '''
+    def __init__(self, precision: int, radius: float):
+        self.precision = precision
+        self.radius = radius
+        self.index_range: CellIndexRange | None = None
+
+    @property
+    def cells(self) -> list[int]:
+        if self.index_range is None:
+            return []
+        return calc_cells_in_index_range(self.index_range, self.precision)
+
+    def update(self, point: Coordinates) -> CoverDelta:
+        old_range = self.index_range
+        new_range = calc_cap_index_range(point, self.precision, self.radius)
+        self.index_range = new_range
+        if old_range is None:
+            return CoverDelta(added=calc_cells_in_index_range(new_range, self.precision), removed=[])
+        if old_range == new_range:
+            return CoverDelta(added=[], removed=[])
+
+        col_count = 1 << ((self.precision + 1) // 2)
+        old_cols = _index_range_cols(old_range, col_count)
+        new_cols = _index_range_cols(new_range, col_count)
+        old_rows = range(old_range.row_start, old_range.row_end + 1)
+        new_rows = range(new_range.row_start, new_range.row_end + 1)
+
+        def cells_of(rows, cols) -> list[int]:
+            col_bits = [_col_geohash_bits(col, self.precision) for col in sorted(cols)]
+            return [_row_geohash_bits(row, self.precision) | bits for row in rows for bits in col_bits]
+
+        # Rows in only one cover change entirely. Rows in both only change in the cols in only one cover.
+        added = cells_of([row for row in new_rows if row not in old_rows], new_cols)
+        removed = cells_of([row for row in old_rows if row not in new_rows], old_cols)
+        shared_rows = range(max(old_range.row_start, new_range.row_start), min(old_range.row_end, new_range.row_end) + 1)
+        added += cells_of(shared_rows, new_cols - old_cols)
+        removed += cells_of(shared_rows, old_cols - new_cols)
+        return CoverDelta(added=added, removed=removed)
+
+@dataclass(slots=True)
+class CoverEstimate:
+    precision: int
+    # Expected number of cells in the cover
+    cell_count: int
+    # Expected area of the cover's cells outside the circle
+    overscan_area_km2: float
+
+MAX_TABLE_PRECISION = 64
+LATITUDE_BAND_DEG = 5
+
+_KM_PER_DEGREE = 2 * math.pi * EARTH_RADIUS_KM / 360
+
+# Height of a cell in km, by precision
+CELL_HEIGHT_KM = [180 / (1 << (precision // 2)) * _KM_PER_DEGREE for precision in range(MAX_TABLE_PRECISION + 1)]
+
+# Width of a cell in km, by precision and band of absolute latitude. Measured at the poleward
+# edge of the band, where cells are narrowest within it.
+CELL_WIDTH_KM = [
+    [360 / (1 << ((precision + 1) // 2)) * _KM_PER_DEGREE * math.cos(math.radians((band + 1) * LATITUDE_BAND_DEG)) for band in range(90 // LATITUDE_BAND_DEG)]
+    for precision in range(MAX_TABLE_PRECISION + 1)
+]
+
+def estimate_cover(point: Coordinates, precision: int, radius: float) -> CoverEstimate:
+    '''
+    Estimate the number of cells and the overscan area of a radius query from the cell dimension tables, without running it.
+    '''
+    if not 0 <= precision <= MAX_TABLE_PRECISION:
+        raise ValueError(f'precision must be between 0 and {MAX_TABLE_PRECISION}, got {precision}')
+    # Cells are narrowest where the circle reaches furthest toward the pole, so take the band from there
+    poleward_lat = min(abs(point.lat) + math.degrees(radius / EARTH_RADIUS_KM), 90)
+    band = min(int(poleward_lat // LATITUDE_BAND_DEG), len(CELL_WIDTH_KM[precision]) - 1)
+    height = CELL_HEIGHT_KM[precision]
+    width = CELL_WIDTH_KM[precision][band]
+
+    # A span of 2*radius overlaps at most one more cell than fits in it
+    rows = min(math.ceil(2 * radius / height) + 1, 1 << (precision // 2))
+    col_count = 1 << ((precision + 1) // 2)
+    cols = min(math.ceil(2 * radius / width) + 1, col_count)
+
+    # Area of the spherical cap within radius km, and of the lat/lon rectangle of cells around it
+    circle_area = 2 * math.pi * EARTH_RADIUS_KM ** 2 * (1 - math.cos(min(radius / EARTH_RADIUS_KM, math.pi)))
+    half_lat_span = rows * height / _KM_PER_DEGREE / 2
+    south_lat = max(point.lat - half_lat_span, -90)
+    north_lat = min(point.lat + half_lat_span, 90)
+    cover_area = 2 * math.pi * EARTH_RADIUS_KM ** 2 * (math.sin(math.radians(north_lat)) - math.sin(math.radians(south_lat))) * cols / col_count
+    return CoverEstimate(precision=precision, cell_count=rows * cols, overscan_area_km2=max(cover_area - circle_area, 0))
+
+def choose_precision(point: Coordinates, radius: float, max_cells: int, max_precision: int = MAX_TABLE_PRECISION) -> CoverEstimate:
+    '''
+    Choose the finest precision, up to `max_precision`, whose radius query is expected to need at most `max_cells` cells.
+
+    Finer precisions scan less area outside the circle but return more cells.
+    Returns the estimate for the chosen precision. Precision 0, a single cell, is chosen if nothing else fits.
+    '''
+    chosen = estimate_cover(point, 0, radius)
+    for precision in range(1, min(max_precision, MAX_TABLE_PRECISION) + 1):
+        estimate = estimate_cover(point, precision, radius)
+        if estimate.cell_count > max_cells:
+            break
+        chosen = estimate
+    return chosen
+
+# Standard geohash base32 alphabet. Each char holds 5 bits of the geohash, most significant first,
+# and sorts in the same order as its value, so strings sort like the integer geohashes.
+BASE32_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+_BASE32_CHARS = frozenset(BASE32_ALPHABET + BASE32_ALPHABET.upper())
+
+# Every 10-bit value as its 2 chars
+_BASE32_PAIRS = [first + second for first in BASE32_ALPHABET for second in BASE32_ALPHABET]
+
+# Maps the geohash alphabet onto the digits `int(text, 32)` parses
+_BASE32_TO_INT_DIGITS = str.maketrans(
+    BASE32_ALPHABET + BASE32_ALPHABET.upper(),
+    '0123456789abcdefghijklmnopqrstuv' * 2,
+)
+
+def _check_base32_precision(precision: int):
+    if precision < 0 or precision % 5 != 0:
+        raise ValueError(f'Base32 geohashes need a precision that is a non-negative multiple of 5, got {precision}')
+
+def geohash_to_base32(cell_geohash: int, precision: int) -> str:
+    '''
+    Convert a geohash of `precision` bits to its base32 string of precision / 5 chars.
+    '''
+    _check_base32_precision(precision)
+    cell_geohash &= (1 << precision) - 1
+    pairs = []
+    shift = precision - 10
+    while shift >= 0:
+        pairs.append(_BASE32_PAIRS[(cell_geohash >> shift) & 0x3FF])
+        shift -= 10
+    if shift == -5:
+        pairs.append(BASE32_ALPHABET[cell_geohash & 0x1F])
+    return ''.join(pairs)
+
+def base32_to_geohash(text: str) -> int:
+    '''
+    Convert a base32 geohash string, in either case, to its geohash of 5 * len(text) bits.
+    '''
+    if not _BASE32_CHARS.issuperset(text):
+        raise ValueError(f'Invalid base32 geohash {text!r}')
+    if not text:
+        return 0
+    return int(text.translate(_BASE32_TO_INT_DIGITS), 32)
+
+def base32_prefix_range(prefix: str, precision: int) -> tuple[int, int]:
+    '''
+    Return the [lo, hi) range of geohashes of `precision` bits whose base32 strings start with `prefix`.
+    '''
+    _check_base32_precision(precision)
+    shift = precision - 5 * len(prefix)
+    if shift < 0:
+        raise ValueError(f'Prefix {prefix!r} is longer than a geohash of precision {precision}')
+    lo = base32_to_geohash(prefix) << shift
+    return lo, lo + (1 << shift)
+
+def base32_prefix_upper_bound(prefix: str) -> str | None:
+    '''
+    Return the smallest string greater than every base32 geohash starting with `prefix`,
+    so `prefix <= text < upper_bound` selects them in a sorted string column.
+    Returns None when there is no such string, i.e. for a prefix of only 'z's.
+    '''
+    prefix = prefix.lower()
+    if not _BASE32_CHARS.issuperset(prefix):
+        raise ValueError(f'Invalid base32 geohash prefix {prefix!r}')
+    stripped = prefix.rstrip(BASE32_ALPHABET[-1])
+    if not stripped:
+        return None
+    return stripped[:-1] + BASE32_ALPHABET[BASE32_ALPHABET.index(stripped[-1]) + 1]
+
+def range_to_base32(lo: int, hi: int, precision: int) -> tuple[str, str | None]:
+    '''
+    Convert a [lo, hi) range of geohashes, e.g. from `cells_to_ranges`, to the equivalent [start, end) range of base32 strings.
+
+    The end is None when the range runs to the last geohash.
+    '''
+    end = None if hi >= 1 << precision else geohash_to_base32(hi, precision)
+    return geohash_to_base32(lo, precision), end
@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+import geohash_batch
+from geohash import CellIndexRange
+
+# Largest dense grid `CellAggregate.to_grid` will allocate, in cells
+MAX_GRID_CELLS = 1 << 28
+
+STATISTICS = ('count', 'sum', 'min', 'max', 'mean')
+
+@dataclass
+class CellAggregate:
+    # Sorted unique uint64 geohashes of the cells holding at least one point, and parallel arrays of their statistics
+    geohashes: np.ndarray
+    counts: np.ndarray
+    sums: np.ndarray
+    mins: np.ndarray
+    maxs: np.ndarray
+    precision: int
+
+    @classmethod
+    def build(cls, geohashes, precision: int, values=None) -> 'CellAggregate':
+        '''
+        Aggregate the points with the given geohashes of `precision` bits, and optionally a value per point.
+
+        Without `values`, every point has the value 1, so the sums are the counts.
+        '''
+        geohashes = np.asarray(geohashes, dtype=np.uint64)
+        values = np.broadcast_to(np.asarray(1.0 if values is None else values, dtype=np.float64), geohashes.shape)
+        order = np.argsort(geohashes, kind='stable')
+        values = values[order]
+        return cls._reduce(geohashes[order], np.ones(len(geohashes), dtype=np.int64), values, values, values, precision)
+
+    @classmethod
+    def from_points(cls, lats, lons, precision: int, values=None) -> 'CellAggregate':
+        '''
+        Same as `build`, geohashing the points first.
+        '''
+        return cls.build(geohash_batch.calc_geohashes(lats, lons, precision), precision, values)
+
+    @classmethod
+    def merge(cls, aggregates: list['CellAggregate']) -> 'CellAggregate':
+        '''
+        Combine partial aggregates, e.g. from parallel workers each given part of the points.
+
+        Aggregates of different precisions are first rolled up to the coarsest of them.
+        '''
+        if not aggregates:
+            raise ValueError('Need at least one aggregate to merge')
+        precision = min(aggregate.precision for aggregate in aggregates)
+        aggregates = [aggregate.rollup(precision) for aggregate in aggregates]
+        geohashes = np.concatenate([aggregate.geohashes for aggregate in aggregates])
+        order = np.argsort(geohashes, kind='stable')
+        return cls._reduce(
+            geohashes[order],
+            np.concatenate([aggregate.counts for aggregate in aggregates])[order],
+            np.concatenate([aggregate.sums for aggregate in aggregates])[order],
+            np.concatenate([aggregate.mins for aggregate in aggregates])[order],
+            np.concatenate([aggregate.maxs for aggregate in aggregates])[order],
+            precision,
+        )
+
+    @classmethod
+    def _reduce(cls, geohashes: np.ndarray, counts: np.ndarray, sums: np.ndarray, mins: np.ndarray, maxs: np.ndarray, precision: int) -> 'CellAggregate':
+        # Combine the runs of equal geohashes in the sorted `geohashes`
+        if len(geohashes) == 0:
+            return cls(geohashes=geohashes, counts=counts, sums=np.asarray(sums, dtype=np.float64), mins=np.asarray(mins, dtype=np.float64),
+                       maxs=np.asarray(maxs, dtype=np.float64), precision=precision)
+        starts = np.flatnonzero(np.concatenate(([True], geohashes[1:] != geohashes[:-1])))
+        return cls(
+            geohashes=geohashes[starts],
+            counts=np.add.reduceat(counts, starts),
+            sums=np.add.reduceat(sums, starts),
+            mins=np.minimum.reduceat(mins, starts),
+            maxs=np.maximum.reduceat(maxs, starts),
+            precision=precision,
+        )
+
+    def __len__(self) -> int:
+        return len(self.geohashes)
+
+    def rollup(self, precision: int) -> 'CellAggregate':
+        '''
+        Aggregate into the cells of a coarser `precision`.
+
+        A cell's parent is its geohash shifted right, and shifting keeps the geohashes sorted,
+        so the runs of cells sharing a parent are combined in place without re-sorting.
+        '''
+        if precision > self.precision:
+            raise ValueError(f'Cannot roll up precision {self.precision} to the finer precision {precision}')
+        if precision == self.precision:
+            return self
+        return self._reduce(self.geohashes >> np.uint64(self.precision - precision), self.counts, self.sums, self.mins, self.maxs, precision)
+
+    def means(self) -> np.ndarray:
+        return self.sums / self.counts
+
+    def statistic(self, name: str) -> np.ndarray:
+        if name == 'mean':
+            return self.means()
+        if name not in STATISTICS:
+            raise ValueError(f'Unknown statistic {name!r}, expected one of {STATISTICS}')
+        return getattr(self, name + 's')
+
+    def to_grid(self, statistic: str = 'count', index_range: CellIndexRange | None = None, fill_value=0) -> np.ndarray:
+        '''
+        Return a dense 2D array of a statistic, indexed by [row - row_start, col - col_start].
+
+        Covers the whole grid of cells by default, or just `index_range`, whose cols may wrap across the antimeridian.
+        Row 0 is the southmost row. Cells without points hold `fill_value`.
+        '''
+        row_count = 1 << (self.precision // 2)
+        col_count = 1 << ((self.precision + 1) // 2)
+        if index_range is None:
+            index_range = CellIndexRange(row_start=0, row_end=row_count - 1, col_start=0, col_count=col_count)
+        grid_rows = max(index_range.row_end - index_range.row_start + 1, 0)
+        grid_cols = min(index_range.col_count, col_count)
+        if grid_rows * grid_cols > MAX_GRID_CELLS:
+            raise ValueError(f'A grid of {grid_rows} x {grid_cols} cells is larger than {MAX_GRID_CELLS} cells')
+
+        values = self.statistic(statistic)
+        grid = np.full((grid_rows, grid_cols), fill_value, dtype=np.result_type(values, np.min_scalar_type(fill_value)))
+        rows, cols = geohash_batch.calc_rows_cols(self.geohashes, self.precision)
+        rows = rows - index_range.row_start
+        cols = (cols - index_range.col_start) % col_count
+        within = (rows >= 0) & (rows < grid_rows) & (cols < grid_cols)
+        grid[rows[within], cols[within]] = values[within]
+        return grid
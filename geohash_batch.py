@@ -0,0 +1,272 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import numpy as np
+
+from geohash import BASE32_ALPHABET, EARTH_RADIUS_KM
+
+MAX_BATCH_PRECISION = 64
+
+DEFAULT_MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Float64 N x M arrays alive at once while computing a distance matrix block
+_MATRIX_TEMPORARIES = 6
+
+COORDINATES_DTYPE = np.dtype([('lat', np.float64), ('lon', np.float64)])
+
+_BASE32_CODES = np.frombuffer(BASE32_ALPHABET.encode('ascii'), dtype=np.uint8)
+
+# Value of each byte as a base32 geohash char, in either case, or 0xFF if it is not one
+_BASE32_VALUES = np.full(256, 0xFF, dtype=np.uint8)
+_BASE32_VALUES[_BASE32_CODES] = np.arange(32, dtype=np.uint8)
+_BASE32_VALUES[np.frombuffer(BASE32_ALPHABET.upper().encode('ascii'), dtype=np.uint8)[10:]] = np.arange(10, 32, dtype=np.uint8)
+
+CELL_BOUNDARY_DTYPE = np.dtype([
+    ('start_lat', np.float64),
+    ('end_lat', np.float64),
+    ('start_lon', np.float64),
+    ('end_lon', np.float64),
+])
+
+@dataclass
+class CellBoundaries:
+    # Parallel float64 arrays, one entry per cell. Same sides as `geohash.CellBoundary`
+    start_lat: np.ndarray
+    end_lat: np.ndarray
+    start_lon: np.ndarray
+    end_lon: np.ndarray
+
+    def centers(self) -> tuple[np.ndarray, np.ndarray]:
+        return (self.start_lat + self.end_lat) / 2, (self.start_lon + self.end_lon) / 2
+
+    def to_structured(self) -> np.ndarray:
+        result = np.empty(self.start_lat.shape, dtype=CELL_BOUNDARY_DTYPE)
+        result['start_lat'] = self.start_lat
+        result['end_lat'] = self.end_lat
+        result['start_lon'] = self.start_lon
+        result['end_lon'] = self.end_lon
+        return result
+
+def _check_precision(precision: int):
+    if not 0 <= precision <= MAX_BATCH_PRECISION:
+        raise ValueError(f'precision must be between 0 and {MAX_BATCH_PRECISION}, got {precision}')
+
+def calc_geohashes(lats, lons, precision: int) -> np.ndarray:
+    '''
+    Vectorized counterpart of `geohash.calc_geohash`.
+
+    `lats` and `lons` are broadcast against each other and every point is bisected at once,
+    one whole-array step per bit. The result is a uint64 array with the same geohashes
+    `calc_geohash` would return for each point.
+    '''
+    _check_precision(precision)
+    lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+
+    lat_min = np.full(lats.shape, -90.0)
+    lat_max = np.full(lats.shape, 90.0)
+    lon_min = np.full(lons.shape, -180.0)
+    lon_max = np.full(lons.shape, 180.0)
+
+    geohashes = np.zeros(lats.shape, dtype=np.uint64)
+    for i in range(precision):
+        is_col_bit = i % 2 == 0
+        if is_col_bit:
+            # Divide left-right
+            lon_mid = (lon_min + lon_max) / 2
+            new_bits = lons >= lon_mid
+            np.copyto(lon_min, lon_mid, where=new_bits)
+            np.copyto(lon_max, lon_mid, where=~new_bits)
+        else:
+            # Divide up-down
+            lat_mid = (lat_min + lat_max) / 2
+            new_bits = lats >= lat_mid
+            np.copyto(lat_min, lat_mid, where=new_bits)
+            np.copyto(lat_max, lat_mid, where=~new_bits)
+        geohashes <<= np.uint64(1)
+        geohashes |= new_bits.astype(np.uint64)
+    return geohashes
+
+def calc_geohashes_from_points(points: np.ndarray, precision: int) -> np.ndarray:
+    '''
+    Same as `calc_geohashes`, for a structured array with `lat` and `lon` fields (see `COORDINATES_DTYPE`).
+    '''
+    return calc_geohashes(points['lat'], points['lon'], precision)
+
+def calc_cell_boundaries(cell_geohashes, precision: int) -> CellBoundaries:
+    '''
+    Vectorized counterpart of `geohash.calc_cell_boundary`.
+
+    Decodes every geohash in `cell_geohashes` at once, one whole-array step per bit,
+    without creating a `CellBoundary` per cell.
+    '''
+    _check_precision(precision)
+    cell_geohashes = np.asarray(cell_geohashes, dtype=np.uint64)
+
+    lat_min = np.full(cell_geohashes.shape, -90.0)
+    lat_max = np.full(cell_geohashes.shape, 90.0)
+    lon_min = np.full(cell_geohashes.shape, -180.0)
+    lon_max = np.full(cell_geohashes.shape, 180.0)
+
+    is_col_bit = True
+    for i in range(precision-1, -1, -1):
+        bits = (cell_geohashes >> np.uint64(i)) & np.uint64(1) != 0
+        if is_col_bit:
+            lon_mid = (lon_min + lon_max) / 2
+            # Right side
+            np.copyto(lon_min, lon_mid, where=bits)
+            # Left side
+            np.copyto(lon_max, lon_mid, where=~bits)
+        else:
+            lat_mid = (lat_min + lat_max) / 2
+            # Top side
+            np.copyto(lat_min, lat_mid, where=bits)
+            # Bottom side
+            np.copyto(lat_max, lat_mid, where=~bits)
+        is_col_bit = not is_col_bit
+
+    return CellBoundaries(
+        start_lat=lat_min,
+        end_lat=lat_max,
+        start_lon=lon_min,
+        end_lon=lon_max,
+    )
+
+def calc_cell_centers(cell_geohashes, precision: int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Return the (lats, lons) of the centers of every cell in `cell_geohashes`.
+    '''
+    return calc_cell_boundaries(cell_geohashes, precision).centers()
+
+def calc_distances_km(lats1, lons1, lats2, lons2) -> np.ndarray:
+    '''
+    Vectorized counterpart of `geohash.calc_distance_km`.
+
+    The inputs are broadcast against each other, so a single point against arrays of points
+    gives the distance from that point to each of them.
+    '''
+    lats1_rad = np.radians(np.asarray(lats1, dtype=np.float64))
+    lons1_rad = np.radians(np.asarray(lons1, dtype=np.float64))
+    lats2_rad = np.radians(np.asarray(lats2, dtype=np.float64))
+    lons2_rad = np.radians(np.asarray(lons2, dtype=np.float64))
+    return _haversine_km(lats1_rad, lons1_rad, np.cos(lats1_rad), lats2_rad, lons2_rad, np.cos(lats2_rad))
+
+def _haversine_km(lats1_rad, lons1_rad, cos_lats1, lats2_rad, lons2_rad, cos_lats2) -> np.ndarray:
+    # Same formula as `geohash.calc_distance_km`, on inputs already converted to radians
+    a = np.sin((lats2_rad - lats1_rad) / 2) ** 2 + cos_lats1 * cos_lats2 * np.sin((lons2_rad - lons1_rad) / 2) ** 2
+    return 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)) * EARTH_RADIUS_KM
+
+def iter_distance_matrix_chunks(lats1, lons1, lats2, lons2, max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES) -> Iterator[tuple[int, np.ndarray]]:
+    '''
+    Yield (row_start, distances) blocks of the N x M matrix of distances between points 1 and points 2.
+
+    Each block covers consecutive rows (points 1), sized so the block and the temporaries used to compute it
+    stay within about `max_chunk_bytes`.
+    '''
+    lats1_rad = np.radians(np.asarray(lats1, dtype=np.float64))
+    lons1_rad = np.radians(np.asarray(lons1, dtype=np.float64))
+    lats2_rad = np.radians(np.asarray(lats2, dtype=np.float64))
+    lons2_rad = np.radians(np.asarray(lons2, dtype=np.float64))
+    cos_lats1 = np.cos(lats1_rad)
+    cos_lats2 = np.cos(lats2_rad)
+
+    row_bytes = max(len(lats2_rad), 1) * np.dtype(np.float64).itemsize * _MATRIX_TEMPORARIES
+    chunk_rows = max(max_chunk_bytes // row_bytes, 1)
+    for row_start in range(0, len(lats1_rad), chunk_rows):
+        rows = slice(row_start, row_start + chunk_rows)
+        yield row_start, _haversine_km(
+            lats1_rad[rows, np.newaxis], lons1_rad[rows, np.newaxis], cos_lats1[rows, np.newaxis],
+            lats2_rad, lons2_rad, cos_lats2,
+        )
+
+def calc_distance_matrix_km(lats1, lons1, lats2, lons2, max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES) -> np.ndarray:
+    '''
+    Calculate the N x M matrix of distances between points 1 and points 2.
+
+    Only the result is allocated in full; it is filled in blocks from `iter_distance_matrix_chunks`.
+    '''
+    result = np.empty((len(lats1), len(lats2)))
+    for row_start, block in iter_distance_matrix_chunks(lats1, lons1, lats2, lons2, max_chunk_bytes):
+        result[row_start:row_start + len(block)] = block
+    return result
+
+def _compact_bits(values: np.ndarray) -> np.ndarray:
+    # Vectorized `geohash._compact_bits` for uint64 arrays: gather the even bit positions
+    x = values & np.uint64(0x5555555555555555)
+    x = (x | (x >> np.uint64(1))) & np.uint64(0x3333333333333333)
+    x = (x | (x >> np.uint64(2))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    x = (x | (x >> np.uint64(4))) & np.uint64(0x00FF00FF00FF00FF)
+    x = (x | (x >> np.uint64(8))) & np.uint64(0x0000FFFF0000FFFF)
+    x = (x | (x >> np.uint64(16))) & np.uint64(0xFFFFFFFF)
+    return x
+
+def calc_rows_cols(cell_geohashes, precision: int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Vectorized counterpart of `geohash.geohash_to_row_col`, returning int64 (row_indices, col_indices) arrays.
+    '''
+    _check_precision(precision)
+    cell_geohashes = np.asarray(cell_geohashes, dtype=np.uint64)
+    if precision < MAX_BATCH_PRECISION:
+        cell_geohashes = cell_geohashes & np.uint64((1 << precision) - 1)
+    even = cell_geohashes
+    odd = cell_geohashes >> np.uint64(1)
+    if precision % 2 == 0:
+        return _compact_bits(even).astype(np.int64), _compact_bits(odd).astype(np.int64)
+    return _compact_bits(odd).astype(np.int64), _compact_bits(even).astype(np.int64)
+
+def geohashes_to_base32(cell_geohashes, precision: int) -> np.ndarray:
+    '''
+    Vectorized counterpart of `geohash.geohash_to_base32`.
+
+    Returns a fixed-width bytes array (dtype `S<precision / 5>`) of ASCII base32 strings. Its `tobytes()`
+    is the strings back to back, without separators.
+    '''
+    _check_precision(precision)
+    if precision % 5 != 0:
+        raise ValueError(f'Base32 geohashes need a precision that is a multiple of 5, got {precision}')
+    cell_geohashes = np.asarray(cell_geohashes, dtype=np.uint64)
+    length = precision // 5
+    if length == 0:
+        return np.zeros(cell_geohashes.shape, dtype='S1')
+
+    chars = np.empty(cell_geohashes.shape + (length,), dtype=np.uint8)
+    for i in range(length):
+        chars[..., i] = _BASE32_CODES[(cell_geohashes >> np.uint64(precision - 5 * (i + 1))) & np.uint64(0x1F)]
+    return chars.view(f'S{length}')[..., 0]
+
+def base32_to_geohashes(codes, length: int | None = None) -> np.ndarray:
+    '''
+    Vectorized counterpart of `geohash.base32_to_geohash`, returning uint64 geohashes of 5 * length bits.
+
+    `codes` is an array or sequence of equal-length strings, or a bytes-like buffer of strings of `length`
+    chars back to back, as from `geohashes_to_base32(...).tobytes()`.
+    '''
+    if isinstance(codes, (bytes, bytearray, memoryview)):
+        if not length:
+            raise ValueError('length is required to split a bytes buffer into geohashes')
+        chars = np.frombuffer(codes, dtype=np.uint8)
+        if len(chars) % length:
+            raise ValueError(f'Buffer of {len(chars)} bytes does not hold whole geohashes of {length} chars')
+        chars = chars.reshape(-1, length)
+        shape = (len(chars),)
+    else:
+        codes = np.asarray(codes)
+        if codes.size == 0:
+            return np.zeros(codes.shape, dtype=np.uint64)
+        codes = np.char.encode(codes, 'ascii') if codes.dtype.kind == 'U' else codes.astype(np.bytes_)
+        if length is not None and length != codes.dtype.itemsize:
+            raise ValueError(f'Expected geohashes of {length} chars, got {codes.dtype.itemsize}')
+        length = codes.dtype.itemsize
+        chars = np.ascontiguousarray(codes).reshape(-1).view(np.uint8).reshape(-1, length)
+        shape = codes.shape
+    if 5 * length > MAX_BATCH_PRECISION:
+        raise ValueError(f'Geohashes of {length} chars do not fit in {MAX_BATCH_PRECISION} bits')
+
+    # Shorter strings in a fixed-width array are padded with zero bytes, which are not valid chars
+    values = _BASE32_VALUES[chars]
+    if np.any(values == 0xFF):
+        raise ValueError('Invalid or shorter base32 geohashes in input')
+    geohashes = np.zeros(len(chars), dtype=np.uint64)
+    for i in range(length):
+        geohashes <<= np.uint64(5)
+        geohashes |= values[:, i].astype(np.uint64)
+    return geohashes.reshape(shape)
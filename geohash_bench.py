@@ -0,0 +1,165 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+
+import geohash
+from geohash import Coordinates
+
+DEFAULT_MIN_TIME_S = 0.2
+DEFAULT_MAX_CALLS = 100_000
+DEFAULT_REGRESSION_THRESHOLD = 0.1
+
+PRECISIONS = (15, 16, 25, 26, 35, 36, 51, 52)
+RADIUS_PRECISIONS = (20, 25, 30, 31)
+RADII_KM = (0.5, 5, 50)
+
+LOCATIONS = {
+    'equator': Coordinates(0.0, 0.0),
+    'mid_latitude': Coordinates(41.881832, -87.623177),
+    'antimeridian': Coordinates(-16.5, 179.999),
+    'near_pole': Coordinates(89.9, 10.0),
+}
+
+# Radius cases expected to cover more cells than this are skipped, e.g. fine precisions near the poles
+MAX_RADIUS_CELLS = 100_000
+
+LATENCY_PERCENTILES = (50, 90, 99)
+
+@dataclass
+class BenchmarkResult:
+    calls: int
+    ops_per_s: float
+    # Latency of a single call, by percentile
+    latency_us: dict[str, float]
+    # Peak memory allocated by a single call
+    peak_memory_kb: float
+
+@dataclass
+class Regression:
+    case: str
+    metric: str
+    baseline: float
+    current: float
+
+def iter_cases() -> Iterator[tuple[str, Callable[[], object]]]:
+    '''
+    Yield (name, call) for every benchmarked operation, precision and location.
+    '''
+    for location_name, point in LOCATIONS.items():
+        for precision in PRECISIONS:
+            ghash = geohash.calc_geohash(point, precision)
+            yield f'calc_geohash/{location_name}/p{precision}', lambda point=point, precision=precision: geohash.calc_geohash(point, precision)
+            yield f'calc_cell_boundary/{location_name}/p{precision}', lambda ghash=ghash, precision=precision: geohash.calc_cell_boundary(ghash, precision)
+            yield f'displace_cell/{location_name}/p{precision}', lambda ghash=ghash, precision=precision: geohash.displace_cell(ghash, precision, 1, -1)
+
+        for precision in RADIUS_PRECISIONS:
+            for radius in RADII_KM:
+                if geohash.estimate_cover(point, precision, radius).cell_count > MAX_RADIUS_CELLS:
+                    continue
+                yield (f'calc_cells_within_radius/{location_name}/p{precision}/r{radius:g}',
+                       lambda point=point, precision=precision, radius=radius: geohash.calc_cells_within_radius(point, precision, radius))
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    # Nearest-rank percentile
+    index = max(round(percentile / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def run_case(call: Callable[[], object], min_time: float = DEFAULT_MIN_TIME_S, max_calls: int = DEFAULT_MAX_CALLS) -> BenchmarkResult:
+    '''
+    Time `call` repeatedly for about `min_time` seconds, then measure the peak memory of one more call.
+
+    Memory is traced in a separate call, as tracing slows down every allocation.
+    '''
+    call()
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < max_calls:
+        call_start = time.perf_counter()
+        call()
+        call_end = time.perf_counter()
+        latencies.append(call_end - call_start)
+        if call_end - start >= min_time:
+            break
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return BenchmarkResult(
+        calls=len(latencies),
+        ops_per_s=len(latencies) / elapsed,
+        latency_us={f'p{percentile}': _percentile(latencies, percentile) * 1e6 for percentile in LATENCY_PERCENTILES},
+        peak_memory_kb=peak / 1024,
+    )
+
+def run_benchmarks(name_filter: str = '', min_time: float = DEFAULT_MIN_TIME_S, max_calls: int = DEFAULT_MAX_CALLS, verbose: bool = False) -> dict:
+    '''
+    Run every case whose name contains `name_filter`, returning a JSON-serializable report.
+    '''
+    results = {}
+    for name, call in iter_cases():
+        if name_filter not in name:
+            continue
+        results[name] = asdict(run_case(call, min_time, max_calls))
+        if verbose:
+            print(f"{name:60} {results[name]['ops_per_s']:>14,.0f} ops/s", file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+
+def compare_results(report: dict, baseline: dict, threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> list[Regression]:
+    '''
+    Find the cases that are more than `threshold` (a fraction) slower, or use that much more peak memory, than in `baseline`.
+
+    Cases missing from either report are not compared.
+    '''
+    regressions = []
+    for name, result in report['results'].items():
+        baseline_result = baseline['results'].get(name)
+        if baseline_result is None:
+            continue
+        if result['ops_per_s'] < baseline_result['ops_per_s'] * (1 - threshold):
+            regressions.append(Regression(case=name, metric='ops_per_s', baseline=baseline_result['ops_per_s'], current=result['ops_per_s']))
+        if result['peak_memory_kb'] > baseline_result['peak_memory_kb'] * (1 + threshold):
+            regressions.append(Regression(case=name, metric='peak_memory_kb', baseline=baseline_result['peak_memory_kb'], current=result['peak_memory_kb']))
+    return regressions
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark geohash encode, decode, neighbor and radius queries.')
+    parser.add_argument('--output', help='write the results as JSON to this file, e.g. to save a baseline')
+    parser.add_argument('--baseline', help='compare against the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD, help='allowed slowdown or memory growth, as a fraction')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME_S, help='seconds to time each case for')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.filter, args.min_time, verbose=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_results(report, baseline, args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION {regression.case} {regression.metric}: {regression.baseline:,.1f} -> {regression.current:,.1f}', file=sys.stderr)
+    print(f'{len(regressions)} regressions in {len(report["results"])} cases', file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
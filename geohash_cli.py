@@ -0,0 +1,137 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from functools import partial
+from typing import TextIO
+
+import numpy as np
+
+import geohash_batch
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Chunks submitted to the pool per worker before waiting on the oldest one
+_CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+def _encode_csv_chunk(lines: list[str], lat_index: int, lon_index: int, precision: int) -> str:
+    rows = list(csv.reader(lines))
+    lats = np.array([row[lat_index] for row in rows], dtype=np.float64)
+    lons = np.array([row[lon_index] for row in rows], dtype=np.float64)
+    geohashes = geohash_batch.calc_geohashes(lats, lons, precision)
+
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    for row, ghash in zip(rows, geohashes.tolist()):
+        writer.writerow(row + [ghash])
+    return output.getvalue()
+
+def _encode_ndjson_chunk(lines: list[str], lat_field: str, lon_field: str, output_field: str, precision: int) -> str:
+    records = [json.loads(line) for line in lines]
+    lats = np.array([record[lat_field] for record in records], dtype=np.float64)
+    lons = np.array([record[lon_field] for record in records], dtype=np.float64)
+    geohashes = geohash_batch.calc_geohashes(lats, lons, precision)
+
+    output = io.StringIO()
+    for record, ghash in zip(records, geohashes.tolist()):
+        record[output_field] = ghash
+        output.write(json.dumps(record))
+        output.write('\n')
+    return output.getvalue()
+
+def _iter_chunks(items, chunk_size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class _InProcessExecutor(Executor):
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+def encode_stream(input_file: TextIO, output_file: TextIO, precision: int, file_format: str = 'csv', workers: int = 1,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE, lat_column: str = 'lat', lon_column: str = 'lon', output_column: str = 'geohash') -> int:
+    '''
+    Copy CSV or NDJSON rows from `input_file` to `output_file`, adding the geohash of each row's coordinates.
+
+    Rows are read as raw lines and parsed and encoded in chunks of `chunk_size`, spread over `workers` processes,
+    and written in input order. At most a couple of chunks per worker are held in memory at once.
+    CSV fields must not contain line breaks.
+    Returns the number of rows written.
+    '''
+    if file_format == 'csv':
+        header_line = input_file.readline()
+        if not header_line.strip():
+            return 0
+        header = next(csv.reader([header_line]))
+        for column in (lat_column, lon_column):
+            if column not in header:
+                raise ValueError(f'Input has no {column!r} column')
+        csv.writer(output_file, lineterminator='\n').writerow(header + [output_column])
+        encode_chunk = partial(_encode_csv_chunk, lat_index=header.index(lat_column), lon_index=header.index(lon_column), precision=precision)
+    elif file_format == 'ndjson':
+        encode_chunk = partial(_encode_ndjson_chunk, lat_field=lat_column, lon_field=lon_column, output_field=output_column, precision=precision)
+    else:
+        raise ValueError(f'Unsupported format {file_format!r}')
+    lines = (line for line in input_file if line.strip())
+
+    row_count = 0
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InProcessExecutor()
+    with executor:
+        in_flight: deque[tuple[Future, int]] = deque()
+        for chunk in _iter_chunks(lines, chunk_size):
+            in_flight.append((executor.submit(encode_chunk, chunk), len(chunk)))
+            if len(in_flight) >= max(workers, 1) * _CHUNKS_IN_FLIGHT_PER_WORKER:
+                future, count = in_flight.popleft()
+                output_file.write(future.result())
+                row_count += count
+        while in_flight:
+            future, count = in_flight.popleft()
+            output_file.write(future.result())
+            row_count += count
+    return row_count
+
+def _detect_format(path: str) -> str:
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Add a geohash column to a CSV or NDJSON file of points.')
+    parser.add_argument('input', help="input file, or '-' for stdin")
+    parser.add_argument('output', help="output file, or '-' for stdout")
+    parser.add_argument('--precision', type=int, required=True, help='geohash precision in bits')
+    parser.add_argument('--format', choices=('csv', 'ndjson'), help='defaults to ndjson for .ndjson/.jsonl inputs, otherwise csv')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--lat-column', default='lat')
+    parser.add_argument('--lon-column', default='lon')
+    parser.add_argument('--output-column', default='geohash')
+    args = parser.parse_args(argv)
+
+    file_format = args.format or _detect_format(args.input)
+    input_file = sys.stdin if args.input == '-' else open(args.input, newline='')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    start = time.perf_counter()
+    try:
+        row_count = encode_stream(input_file, output_file, args.precision, file_format, args.workers, args.chunk_size,
+                                  args.lat_column, args.lon_column, args.output_column)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    elapsed = time.perf_counter() - start
+    print(f'Encoded {row_count} rows in {elapsed:.2f}s ({row_count / max(elapsed, 1e-9):.0f} rows/s)', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+import heapq
+import math
+import mmap
+import struct
+from dataclasses import dataclass
+
+import numpy as np
+
+import geohash
+import geohash_batch
+from geohash import CellBoundary, Coordinates, EARTH_RADIUS_KM
+
+DEFAULT_INDEX_PRECISION = 50
+
+# Index file format, all little-endian:
+#   header, INDEX_FILE_HEADER_SIZE bytes:
+#     magic     4 bytes   b'GHIX'
+#     version   uint32    INDEX_FILE_VERSION
+#     precision uint32    precision of the geohashes
+#     reserved  uint32    0
+#     count     uint64    number of points
+#     padding   zeros up to INDEX_FILE_HEADER_SIZE
+#   geohashes   uint64[count], sorted ascending
+#   lats        float64[count]
+#   lons        float64[count]
+#   ids         int64[count]
+# The columns are 8-byte aligned, so they can be mapped as arrays without copying.
+INDEX_FILE_MAGIC = b'GHIX'
+INDEX_FILE_VERSION = 1
+INDEX_FILE_HEADER_SIZE = 64
+_INDEX_FILE_HEADER = struct.Struct('<4sIIIQ')
+_INDEX_FILE_COLUMNS = (('geohashes', '<u8'), ('lats', '<f8'), ('lons', '<f8'), ('ids', '<i8'))
+
+# Query covers use cells about a quarter of the query's extent, so a cover is a handful of cells across
+_COVER_CELLS_ACROSS = 4
+
+@dataclass
+class RadiusMatches:
+    ids: np.ndarray
+    distances_km: np.ndarray
+
+class GeohashIndex:
+    '''
+    In-memory point index stored as parallel arrays sorted by geohash.
+
+    Each point costs a uint64 geohash, two float64 coordinates and its id, with no Python object per point.
+    Queries cover the search area with cells, binary search the sorted geohashes for each cell range,
+    then filter the candidates exactly.
+    '''
+    def __init__(self, geohashes: np.ndarray, lats: np.ndarray, lons: np.ndarray, ids: np.ndarray, precision: int):
+        # Arrays must already be sorted by geohash. Use `build` to index unsorted points.
+        self.geohashes = geohashes
+        self.lats = lats
+        self.lons = lons
+        self.ids = ids
+        self.precision = precision
+
+    @classmethod
+    def build(cls, lats, lons, ids=None, precision: int = DEFAULT_INDEX_PRECISION) -> 'GeohashIndex':
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        ids = np.arange(len(lats), dtype=np.int64) if ids is None else np.asarray(ids)
+        if not len(lats) == len(lons) == len(ids):
+            raise ValueError(f'lats, lons and ids must have the same length, got {len(lats)}, {len(lons)} and {len(ids)}')
+
+        geohashes = geohash_batch.calc_geohashes(lats, lons, precision)
+        order = np.argsort(geohashes, kind='stable')
+        return cls(geohashes[order], lats[order], lons[order], ids[order], precision)
+
+    @classmethod
+    def build_file(cls, path: str, lats, lons, ids=None, precision: int = DEFAULT_INDEX_PRECISION) -> 'GeohashIndex':
+        '''
+        Build an index from unsorted points, write it to `path` and return it opened from the file.
+        '''
+        cls.build(lats, lons, ids, precision).save(path)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str) -> 'GeohashIndex':
+        '''
+        Open an index file written by `save` through a read-only memory map.
+
+        The arrays are views of the mapped file, so processes opening the same file share one copy in the page cache.
+        '''
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mapped) < INDEX_FILE_HEADER_SIZE:
+            raise ValueError(f'{path} is too small to be an index file')
+        magic, version, precision, _, count = _INDEX_FILE_HEADER.unpack_from(mapped, 0)
+        if magic != INDEX_FILE_MAGIC:
+            raise ValueError(f'{path} is not an index file')
+        if version != INDEX_FILE_VERSION:
+            raise ValueError(f'{path} has unsupported index file version {version}')
+        if len(mapped) < INDEX_FILE_HEADER_SIZE + count * 8 * len(_INDEX_FILE_COLUMNS):
+            raise ValueError(f'{path} is truncated')
+
+        columns = {}
+        offset = INDEX_FILE_HEADER_SIZE
+        for name, dtype in _INDEX_FILE_COLUMNS:
+            columns[name] = np.frombuffer(mapped, dtype=dtype, count=count, offset=offset)
+            offset += count * 8
+        return cls(precision=precision, **columns)
+
+    def save(self, path: str):
+        '''
+        Write the index to `path` in the index file format, for `open`.
+        '''
+        with open(path, 'wb') as f:
+            header = _INDEX_FILE_HEADER.pack(INDEX_FILE_MAGIC, INDEX_FILE_VERSION, self.precision, 0, len(self))
+            f.write(header.ljust(INDEX_FILE_HEADER_SIZE, b'\0'))
+            for name, dtype in _INDEX_FILE_COLUMNS:
+                f.write(np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes())
+
+    def __len__(self) -> int:
+        return len(self.geohashes)
+
+    def _cover_precision(self, lat_span: float, lon_span: float) -> int:
+        # Finest precision whose cells are still at least 1/_COVER_CELLS_ACROSS of the spans
+        precision = 0
+        while precision < self.precision:
+            next_precision = precision + 1
+            lat_step = 180 / (1 << (next_precision // 2))
+            lon_step = 360 / (1 << ((next_precision + 1) // 2))
+            if lat_step * _COVER_CELLS_ACROSS < lat_span or lon_step * _COVER_CELLS_ACROSS < lon_span:
+                break
+            precision = next_precision
+        return precision
+
+    def _radius_cover_precision(self, point: Coordinates, radius: float) -> int:
+        lat_span = 2 * math.degrees(radius / EARTH_RADIUS_KM)
+        lon_span = min(lat_span / max(math.cos(math.radians(point.lat)), 1e-12), 360)
+        return self._cover_precision(lat_span, lon_span)
+
+    def _scan_ranges(self, ranges: list[tuple[int, int]], cover_precision: int) -> np.ndarray:
+        # Positions of the points within the [lo, hi) cell ranges of `cover_precision`
+        shift = self.precision - cover_precision
+        slices = []
+        for lo, hi in ranges:
+            start = np.searchsorted(self.geohashes, np.uint64(lo << shift), side='left')
+            hi = hi << shift
+            end = len(self.geohashes) if hi >> 64 else np.searchsorted(self.geohashes, np.uint64(hi), side='left')
+            if end > start:
+                slices.append(np.arange(start, end))
+        if not slices:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(slices)
+
+    def query_cells(self, cells: list[int], cell_precision: int) -> np.ndarray:
+        '''
+        Find the ids of the points in the given cells, e.g. from `geohash.calc_cells_within_radius`, in geohash order.
+        '''
+        return self.ids[self._scan_ranges(geohash.cells_to_ranges(cells), cell_precision)]
+
+    def radius_candidates(self, point: Coordinates, radius: float, cover_precision: int | None = None) -> np.ndarray:
+        '''
+        Find the array positions of the points in the cells covering the circle, before exact distance filtering.
+        '''
+        if cover_precision is None:
+            cover_precision = self._radius_cover_precision(point, radius)
+        ranges = geohash.calc_ranges_within_radius(point, cover_precision, radius)
+        return self._scan_ranges(ranges, cover_precision)
+
+    def query_radius(self, point: Coordinates, radius: float, cover_precision: int | None = None) -> RadiusMatches:
+        '''
+        Find the points within radius km of `point`, in geohash order.
+        '''
+        positions = self.radius_candidates(point, radius, cover_precision)
+        distances = geohash_batch.calc_distances_km(point.lat, point.lon, self.lats[positions], self.lons[positions])
+        within = distances <= radius
+        return RadiusMatches(ids=self.ids[positions[within]], distances_km=distances[within])
+
+    def query_bbox(self, south_west: Coordinates, north_east: Coordinates) -> np.ndarray:
+        '''
+        Find the ids of the points in the box between `south_west` and `north_east`, in geohash order.
+
+        If `south_west` is east of `north_east`, the box crosses the antimeridian.
+        '''
+        lat_span = north_east.lat - south_west.lat
+        lon_span = north_east.lon - south_west.lon
+        if lon_span < 0:
+            lon_span += 360
+        cover_precision = self._cover_precision(lat_span, lon_span)
+        cells = geohash.calc_cells_within_bbox(south_west, north_east, cover_precision)
+        positions = self._scan_ranges(geohash.cells_to_ranges(cells), cover_precision)
+
+        lats = self.lats[positions]
+        lons = self.lons[positions]
+        within = (lats >= south_west.lat) & (lats <= north_east.lat)
+        if south_west.lon <= north_east.lon:
+            within &= (lons >= south_west.lon) & (lons <= north_east.lon)
+        else:
+            within &= (lons >= south_west.lon) | (lons <= north_east.lon)
+        return self.ids[positions[within]]
+
+    def _nearest_cell_precision(self, point: Coordinates, k: int) -> int:
+        # Finest precision whose cell around `point` holds at least k points
+        point_geohash = geohash.calc_geohash(point, self.precision)
+        for precision in range(self.precision, 0, -1):
+            cell = point_geohash >> (self.precision - precision)
+            if len(self._scan_ranges([(cell, cell + 1)], precision)) >= k:
+                return precision
+        return 0
+
+    def query_nearest(self, point: Coordinates, k: int, cell_precision: int | None = None) -> RadiusMatches:
+        '''
+        Find the k points closest to `point`, nearest first.
+
+        Visits rings of cells outward from the cell containing `point`, keeping the k closest points
+        seen so far, until no unvisited cell can hold a point closer than the k-th closest.
+        Cols wrap across the antimeridian, rows stop at the poles.
+        By default, cells are the finest whose cell around `point` holds at least k points.
+        A `cell_precision` much finer than the spacing of the points visits many empty rings.
+        '''
+        if k <= 0 or len(self) == 0:
+            return RadiusMatches(ids=self.ids[:0], distances_km=np.empty(0))
+        if cell_precision is None:
+            cell_precision = self._nearest_cell_precision(point, k)
+
+        row_count = 1 << (cell_precision // 2)
+        col_count = 1 << ((cell_precision + 1) // 2)
+        lat_step = 180 / row_count
+        lon_step = 360 / col_count
+        origin_row, origin_col = geohash.geohash_to_row_col(geohash.calc_geohash(point, cell_precision), cell_precision)
+
+        # Max-heap of the k closest (-distance, position) pairs
+        heap = []
+        ring = 0
+        while True:
+            ring_geohashes = [geohash.row_col_to_geohash(row, col, cell_precision) for row, col in _ring_cells(origin_row, origin_col, ring, row_count, col_count)]
+            positions = self._scan_ranges(geohash.cells_to_ranges(ring_geohashes), cell_precision)
+            distances = geohash_batch.calc_distances_km(point.lat, point.lon, self.lats[positions], self.lons[positions])
+            if len(heap) == k:
+                closer = distances < -heap[0][0]
+                positions = positions[closer]
+                distances = distances[closer]
+            for position, distance in zip(positions.tolist(), distances.tolist()):
+                if len(heap) < k:
+                    heapq.heappush(heap, (-distance, position))
+                elif distance < -heap[0][0]:
+                    heapq.heappushpop(heap, (-distance, position))
+
+            south_row = origin_row - ring
+            north_row = origin_row + ring
+            covers_all_cols = 2 * ring + 1 >= col_count
+            if south_row <= 0 and north_row >= row_count - 1 and covers_all_cols:
+                break
+
+            if len(heap) == k:
+                # Anything unvisited is beyond the edges of the visited rows and cols
+                bounds = []
+                if north_row < row_count - 1:
+                    bounds.append(geohash.calc_distance_km(point, Coordinates(lat=-90 + (north_row + 1) * lat_step, lon=point.lon)))
+                if south_row > 0:
+                    bounds.append(geohash.calc_distance_km(point, Coordinates(lat=-90 + south_row * lat_step, lon=point.lon)))
+                if not covers_all_cols:
+                    east_lon = -180 + ((origin_col + ring) % col_count + 1) * lon_step
+                    unvisited_width = 360 - (2 * ring + 1) * lon_step
+                    bounds.append(geohash.calc_min_distance_to_boundary_km(point, CellBoundary(start_lat=-90, end_lat=90, start_lon=east_lon, end_lon=east_lon + unvisited_width)))
+                if -heap[0][0] <= min(bounds):
+                    break
+            ring += 1
+
+        nearest = sorted((-negative_distance, position) for negative_distance, position in heap)
+        positions = np.array([position for _, position in nearest], dtype=np.intp)
+        return RadiusMatches(ids=self.ids[positions], distances_km=np.array([distance for distance, _ in nearest]))
+
+def _ring_cells(origin_row: int, origin_col: int, ring: int, row_count: int, col_count: int) -> list[tuple[int, int]]:
+    # Cells whose row or col is `ring` steps from the origin, without repeats once the cols wrap all the way around
+    if ring == 0:
+        return [(origin_row, origin_col)]
+    if 2 * ring + 1 >= col_count:
+        edge_cols = range(col_count)
+    else:
+        edge_cols = [(origin_col + offset) % col_count for offset in range(-ring, ring + 1)]
+    if 2 * ring - 1 >= col_count:
+        side_cols = []
+    else:
+        side_cols = sorted({(origin_col - ring) % col_count, (origin_col + ring) % col_count})
+
+    cells = []
+    for row in range(max(origin_row - ring, 0), min(origin_row + ring, row_count - 1) + 1):
+        cols = edge_cols if abs(row - origin_row) == ring else side_cols
+        cells.extend((row, col) for col in cols)
+    return cells
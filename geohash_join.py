@@ -0,0 +1,102 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+import geohash_batch
+from geohash import Coordinates
+from geohash_index import DEFAULT_INDEX_PRECISION, GeohashIndex
+
+# Candidate (center, point) pairs gathered before their distances are computed in one vectorized pass
+DEFAULT_MAX_CANDIDATES_PER_CHUNK = 1_000_000
+
+@dataclass
+class GeofenceMatches:
+    center_ids: np.ndarray
+    point_ids: np.ndarray
+    distances_km: np.ndarray
+
+def _join_centers(index: GeohashIndex, center_lats: np.ndarray, center_lons: np.ndarray, radii: np.ndarray, center_ids: np.ndarray,
+                  max_candidates_per_chunk: int) -> GeofenceMatches:
+    matches = []
+    chunk_centers = []
+    chunk_positions = []
+    chunk_size = 0
+
+    def filter_chunk():
+        centers = np.concatenate(chunk_centers)
+        positions = np.concatenate(chunk_positions)
+        distances = geohash_batch.calc_distances_km(center_lats[centers], center_lons[centers], index.lats[positions], index.lons[positions])
+        within = distances <= radii[centers]
+        matches.append(GeofenceMatches(center_ids=center_ids[centers[within]], point_ids=index.ids[positions[within]], distances_km=distances[within]))
+
+    for center in range(len(center_lats)):
+        positions = index.radius_candidates(Coordinates(lat=center_lats[center], lon=center_lons[center]), radii[center])
+        if len(positions) == 0:
+            continue
+        chunk_centers.append(np.full(len(positions), center))
+        chunk_positions.append(positions)
+        chunk_size += len(positions)
+        if chunk_size >= max_candidates_per_chunk:
+            filter_chunk()
+            chunk_centers, chunk_positions, chunk_size = [], [], 0
+    if chunk_size:
+        filter_chunk()
+    return _concatenate_matches(matches, center_ids.dtype, index.ids.dtype)
+
+def _concatenate_matches(matches: list[GeofenceMatches], center_id_dtype, point_id_dtype) -> GeofenceMatches:
+    if not matches:
+        return GeofenceMatches(center_ids=np.empty(0, dtype=center_id_dtype), point_ids=np.empty(0, dtype=point_id_dtype), distances_km=np.empty(0))
+    return GeofenceMatches(
+        center_ids=np.concatenate([match.center_ids for match in matches]),
+        point_ids=np.concatenate([match.point_ids for match in matches]),
+        distances_km=np.concatenate([match.distances_km for match in matches]),
+    )
+
+_worker_index: GeohashIndex | None = None
+
+def _init_worker(index_path: str):
+    global _worker_index
+    _worker_index = GeohashIndex.open(index_path)
+
+def _join_centers_in_worker(center_lats, center_lons, radii, center_ids, max_candidates_per_chunk: int) -> GeofenceMatches:
+    return _join_centers(_worker_index, center_lats, center_lons, radii, center_ids, max_candidates_per_chunk)
+
+def geofence_join(center_lats, center_lons, radii, point_lats, point_lons, center_ids=None, point_ids=None, workers: int = 1,
+                  index_precision: int = DEFAULT_INDEX_PRECISION, max_candidates_per_chunk: int = DEFAULT_MAX_CANDIDATES_PER_CHUNK) -> GeofenceMatches:
+    '''
+    Find every (center, point) pair where the point is within the center's radius in km.
+
+    Points are indexed sorted by geohash and centers are visited in geohash order, so consecutive
+    centers scan neighbouring parts of the index. Each center's cell cover is merged against the sorted
+    points, and the candidate pairs are filtered on exact distance in vectorized chunks.
+    With several `workers`, the index is written to a temporary index file that every worker maps,
+    and each worker joins a contiguous run of centers.
+    Matches are grouped by center, in center geohash order.
+    '''
+    center_lats = np.asarray(center_lats, dtype=np.float64)
+    center_lons = np.asarray(center_lons, dtype=np.float64)
+    radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), center_lats.shape)
+    center_ids = np.arange(len(center_lats), dtype=np.int64) if center_ids is None else np.asarray(center_ids)
+    if not len(center_lats) == len(center_lons) == len(center_ids):
+        raise ValueError(f'center_lats, center_lons and center_ids must have the same length, got {len(center_lats)}, {len(center_lons)} and {len(center_ids)}')
+
+    index = GeohashIndex.build(point_lats, point_lons, point_ids, index_precision)
+    order = np.argsort(geohash_batch.calc_geohashes(center_lats, center_lons, index_precision), kind='stable')
+    center_lats, center_lons, radii, center_ids = center_lats[order], center_lons[order], radii[order], center_ids[order]
+
+    if workers <= 1 or len(center_lats) < 2:
+        return _join_centers(index, center_lats, center_lons, radii, center_ids, max_candidates_per_chunk)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index_path = os.path.join(directory, 'points.ghix')
+        index.save(index_path)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index_path,)) as executor:
+            futures = [
+                executor.submit(_join_centers_in_worker, center_lats[run], center_lons[run], radii[run], center_ids[run], max_candidates_per_chunk)
+                for run in np.array_split(np.arange(len(center_lats)), workers)
+            ]
+            matches = [future.result() for future in futures]
+    return _concatenate_matches(matches, center_ids.dtype, index.ids.dtype)
@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+import geohash
+from geohash import Coordinates
+
+# Phases of `geohash.iter_cells_within_radius`, in the order they run
+RADIUS_QUERY_PHASES = ('center', 'west', 'east', 'north', 'south')
+
+DEFAULT_MAX_TRACE_EVENTS = 100_000
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    # Loop iterations: cols walked west or east, or rows expanded north or south
+    iterations: int = 0
+    # `calc_cell_bounds` decodes
+    decode_calls: int = 0
+    cells: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+class RadiusQueryProfiler:
+    '''
+    Records the time and work of each phase of the radius queries run while it is active.
+
+    Phase times are wall-clock time in the phase, including any time the caller spends between cells
+    when consuming `iter_cells_within_radius` lazily.
+    Every `trace_every`th query is also recorded as Chrome trace events (0 records none).
+    '''
+    def __init__(self, trace_every: int = 0, max_trace_events: int = DEFAULT_MAX_TRACE_EVENTS):
+        self.trace_every = trace_every
+        self.max_trace_events = max_trace_events
+        self.reset()
+
+    def reset(self):
+        self.query_count = 0
+        self.phases = {phase: PhaseStats() for phase in RADIUS_QUERY_PHASES}
+        self.trace_events: list[dict] = []
+        self._query_start = 0.0
+        self._phase_start = 0.0
+        self._query_args: dict | None = None
+
+    def start_query(self, point: Coordinates, precision: int, radius: float):
+        self.query_count += 1
+        traced = self.trace_every > 0 and self.query_count % self.trace_every == 0 and len(self.trace_events) < self.max_trace_events
+        self._query_args = {'lat': point.lat, 'lon': point.lon, 'precision': precision, 'radius': radius} if traced else None
+        self._query_start = self._phase_start = time.perf_counter()
+
+    def end_phase(self, phase: str, iterations: int, decode_calls: int, cells: int):
+        now = time.perf_counter()
+        elapsed = now - self._phase_start
+        stats = self.phases[phase]
+        stats.calls += 1
+        stats.iterations += iterations
+        stats.decode_calls += decode_calls
+        stats.cells += cells
+        stats.total_s += elapsed
+        stats.max_s = max(stats.max_s, elapsed)
+        if self._query_args is not None:
+            self._add_trace_event(phase, self._phase_start, elapsed, {'iterations': iterations, 'decode_calls': decode_calls, 'cells': cells})
+        self._phase_start = now
+
+    def end_query(self):
+        if self._query_args is not None:
+            self._add_trace_event('radius_query', self._query_start, time.perf_counter() - self._query_start, self._query_args)
+            self._query_args = None
+
+    def _add_trace_event(self, name: str, start: float, duration: float, args: dict):
+        self.trace_events.append({
+            'name': name,
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': duration * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        })
+
+    def stats(self) -> dict:
+        '''
+        Return the totals and per-phase stats as a plain dict.
+        '''
+        return {
+            'queries': self.query_count,
+            'cells': sum(stats.cells for stats in self.phases.values()),
+            'decode_calls': sum(stats.decode_calls for stats in self.phases.values()),
+            'total_s': sum(stats.total_s for stats in self.phases.values()),
+            'phases': {phase: asdict(stats) for phase, stats in self.phases.items()},
+        }
+
+    def trace(self) -> dict:
+        '''
+        Return the sampled trace events in Chrome's trace event format, e.g. to save as JSON for chrome://tracing or Perfetto.
+        '''
+        return {'traceEvents': list(self.trace_events), 'displayTimeUnit': 'ms'}
+
+@contextmanager
+def profile_radius_queries(profiler: RadiusQueryProfiler | None = None) -> Iterator[RadiusQueryProfiler]:
+    '''
+    Profile the radius queries run inside the `with` block, returning the profiler.
+
+    Profiling is off otherwise, and then costs each query only a check of an unset hook.
+    The profiler is process-wide and not synchronized, so profile one thread at a time.
+    '''
+    profiler = RadiusQueryProfiler() if profiler is None else profiler
+    previous = geohash._radius_query_profiler
+    geohash._radius_query_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        geohash._radius_query_profiler = previous
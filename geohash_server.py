@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import geohash
+import geohash_batch
+from geohash import Coordinates
+
+DEFAULT_BATCH_WINDOW_S = 0.002
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_LATENCY_PERCENTILES = (50, 90, 99)
+
+# Radius queries expected to cover more cells than this are rejected
+DEFAULT_MAX_RADIUS_CELLS = 100_000
+
+# Most recent request latencies kept for the percentiles
+LATENCY_SAMPLE_SIZE = 10_000
+
+@dataclass
+class EncodeRequest:
+    lat: float
+    lon: float
+    precision: int
+
+@dataclass
+class RadiusRequest:
+    point: Coordinates
+    precision: int
+    radius: float
+
+def encode_batch(requests: list[EncodeRequest]) -> list[int | Exception]:
+    '''
+    Geohash a batch of points, one vectorized `geohash_batch.calc_geohashes` call per precision.
+
+    A precision that fails returns its exception for just the requests with that precision.
+    '''
+    results: list[int | Exception] = [0] * len(requests)
+    by_precision: dict[int, list[int]] = {}
+    for i, request in enumerate(requests):
+        by_precision.setdefault(request.precision, []).append(i)
+    for precision, positions in by_precision.items():
+        lats = np.array([requests[i].lat for i in positions], dtype=np.float64)
+        lons = np.array([requests[i].lon for i in positions], dtype=np.float64)
+        try:
+            geohashes = geohash_batch.calc_geohashes(lats, lons, precision).tolist()
+        except Exception as e:
+            geohashes = [e] * len(positions)
+        for i, ghash in zip(positions, geohashes):
+            results[i] = ghash
+    return results
+
+def radius_batch(requests: list[RadiusRequest]) -> list[list[int] | Exception]:
+    '''
+    Run a batch of `geohash.calc_cells_within_radius` queries, computing identical queries in the batch once.
+
+    A query that fails returns its exception in place of its cells.
+    '''
+    cells_by_query: dict[tuple, list[int] | Exception] = {}
+    results = []
+    for request in requests:
+        key = (request.point.lat, request.point.lon, request.precision, request.radius)
+        if key not in cells_by_query:
+            try:
+                cells_by_query[key] = geohash.calc_cells_within_radius(request.point, request.precision, request.radius)
+            except Exception as e:
+                cells_by_query[key] = e
+        results.append(cells_by_query[key])
+    return results
+
+class MicroBatcher:
+    '''
+    Collects concurrently submitted items into batches and runs each batch with `process_batch`.
+
+    A batch is run `batch_window` seconds after its first item arrives, or as soon as it holds
+    `max_batch_size` items. `process_batch` takes a list of items and returns a list of results in
+    the same order, where an exception result fails just the caller of that item. It runs on `executor`,
+    or the event loop's default thread pool if None, and must be picklable for a process pool.
+    '''
+    def __init__(self, process_batch: Callable[[list], list], batch_window: float = DEFAULT_BATCH_WINDOW_S,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, executor: Executor | None = None,
+                 latency_percentiles: tuple[float, ...] = DEFAULT_LATENCY_PERCENTILES):
+        if max_batch_size < 1:
+            raise ValueError(f'max_batch_size must be at least 1, got {max_batch_size}')
+        self.process_batch = process_batch
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.executor = executor
+        self.latency_percentiles = latency_percentiles
+
+        self._pending: list[tuple[object, asyncio.Future, float]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLE_SIZE)
+        self._request_count = 0
+        self._batch_count = 0
+        self._error_count = 0
+
+    async def submit(self, item):
+        '''
+        Add `item` to the current batch and wait for its result.
+        '''
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: list[tuple[object, asyncio.Future, float]]):
+        self._batch_count += 1
+        self._request_count += len(batch)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.process_batch, [item for item, _, _ in batch])
+        except Exception as e:
+            self._error_count += len(batch)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        end = time.perf_counter()
+        for (_, future, start), result in zip(batch, results):
+            self._latencies.append(end - start)
+            is_error = isinstance(result, Exception)
+            self._error_count += is_error
+            # The caller may have been cancelled while the batch ran
+            if future.done():
+                continue
+            if is_error:
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def drain(self):
+        '''
+        Run the pending batch now and wait for every running batch to finish.
+        '''
+        self._flush()
+        if self._running:
+            await asyncio.gather(*self._running)
+
+    def stats(self) -> dict:
+        latencies = np.array(self._latencies)
+        return {
+            'requests': self._request_count,
+            'batches': self._batch_count,
+            'errors': self._error_count,
+            'mean_batch_size': self._request_count / self._batch_count if self._batch_count else 0.0,
+            'pending': len(self._pending),
+            'batch_window_ms': self.batch_window * 1000,
+            'max_batch_size': self.max_batch_size,
+            'latency_ms': {
+                f'p{percentile:g}': float(np.percentile(latencies, percentile)) * 1000 if len(latencies) else None
+                for percentile in self.latency_percentiles
+            },
+        }
+
+class GeohashService:
+    '''
+    In-process client that micro-batches concurrent encode and radius requests.
+
+    Requests are validated before they join a batch, so an invalid request raises ValueError for its own caller only.
+    Radius queries that `geohash.estimate_cover` expects to cover more than `max_radius_cells` cells are rejected.
+    '''
+    def __init__(self, batch_window: float = DEFAULT_BATCH_WINDOW_S, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 executor: Executor | None = None, latency_percentiles: tuple[float, ...] = DEFAULT_LATENCY_PERCENTILES,
+                 max_radius_cells: int = DEFAULT_MAX_RADIUS_CELLS):
+        self.max_radius_cells = max_radius_cells
+        self.encode_batcher = MicroBatcher(encode_batch, batch_window, max_batch_size, executor, latency_percentiles)
+        self.radius_batcher = MicroBatcher(radius_batch, batch_window, max_batch_size, executor, latency_percentiles)
+
+    async def encode(self, lat: float, lon: float, precision: int) -> int:
+        _check_lat_lon(lat, lon)
+        _check_precision(precision, geohash_batch.MAX_BATCH_PRECISION)
+        return await self.encode_batcher.submit(EncodeRequest(lat=lat, lon=lon, precision=precision))
+
+    async def cells_within_radius(self, point: Coordinates, precision: int, radius: float) -> list[int]:
+        _check_lat_lon(point.lat, point.lon)
+        _check_precision(precision, geohash.MAX_TABLE_PRECISION)
+        if not 0 <= radius < math.inf:
+            raise ValueError(f'radius must be a finite, non-negative number of km, got {radius}')
+        cell_count = geohash.estimate_cover(point, precision, radius).cell_count
+        if cell_count > self.max_radius_cells:
+            raise ValueError(f'Query is expected to cover {cell_count} cells, more than the limit of {self.max_radius_cells}')
+        return await self.radius_batcher.submit(RadiusRequest(point=point, precision=precision, radius=radius))
+
+    async def drain(self):
+        await asyncio.gather(self.encode_batcher.drain(), self.radius_batcher.drain())
+
+    def stats(self) -> dict:
+        return {'encode': self.encode_batcher.stats(), 'radius': self.radius_batcher.stats()}
+
+def _check_lat_lon(lat: float, lon: float):
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f'Coordinates must be within -90..90 lat and -180..180 lon, got ({lat}, {lon})')
+
+def _check_precision(precision: int, max_precision: int):
+    if not 0 <= precision <= max_precision:
+        raise ValueError(f'precision must be between 0 and {max_precision}, got {precision}')
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+async def _handle_request(service: GeohashService, method: str, target: str) -> tuple[int, object]:
+    if method != 'GET':
+        return 405, {'error': f'Unsupported method {method}'}
+    url = urlsplit(target)
+    params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    try:
+        if url.path == '/encode':
+            return 200, {'geohash': await service.encode(float(params['lat']), float(params['lon']), int(params['precision']))}
+        if url.path == '/radius':
+            point = Coordinates(lat=float(params['lat']), lon=float(params['lon']))
+            return 200, {'cells': await service.cells_within_radius(point, int(params['precision']), float(params['radius']))}
+    except KeyError as e:
+        return 400, {'error': f'Missing parameter {e.args[0]}'}
+    except ValueError as e:
+        return 400, {'error': str(e)}
+    if url.path == '/stats':
+        return 200, service.stats()
+    return 404, {'error': f'Unknown path {url.path}'}
+
+async def _handle_connection(service: GeohashService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # Minimal HTTP/1.1: one GET request per connection, answered with JSON
+    try:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        while (await reader.readline()).strip():
+            pass
+        if len(request_line) != 3:
+            status, body = 400, {'error': 'Malformed request line'}
+        else:
+            status, body = await _handle_request(service, request_line[0], request_line[1])
+        payload = json.dumps(body).encode()
+        writer.write(
+            f'HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + payload
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def start_server(service: GeohashService, host: str = '127.0.0.1', port: int = 8000) -> asyncio.Server:
+    '''
+    Serve `service` over HTTP.
+
+    GET /encode?lat=&lon=&precision= returns {"geohash": ...}, GET /radius?lat=&lon=&precision=&radius=
+    returns {"cells": [...]}, and GET /stats returns the batching and latency stats.
+    '''
+    return await asyncio.start_server(lambda reader, writer: _handle_connection(service, reader, writer), host, port)
+
+async def _serve(args: argparse.Namespace):
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    service = GeohashService(args.batch_window_ms / 1000, args.max_batch_size, executor, max_radius_cells=args.max_radius_cells)
+    server = await start_server(service, args.host, args.port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Serve micro-batched geohash encode and radius queries over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--batch-window-ms', type=float, default=DEFAULT_BATCH_WINDOW_S * 1000)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-radius-cells', type=int, default=DEFAULT_MAX_RADIUS_CELLS, help='reject radius queries expected to cover more cells')
+    parser.add_argument('--workers', type=int, default=1, help='processes to run batches on; 1 runs them on a thread pool')
+    asyncio.run(_serve(parser.parse_args(argv)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import random
+import unittest
+from collections import defaultdict
+
+import numpy as np
+
+import geohash
+from geohash import CellIndexRange, Coordinates
+from geohash_aggregate import CellAggregate
+from helpers import random_points
+
+
+class GeohashAggregateTest(unittest.TestCase):
+    def assert_aggregate(self, aggregate: CellAggregate, lats, lons, values, precision: int):
+        expected = defaultdict(list)
+        for lat, lon, value in zip(lats, lons, values):
+            expected[geohash.calc_geohash(Coordinates(lat, lon), precision)].append(value)
+
+        self.assertEqual(precision, aggregate.precision)
+        self.assertEqual(sorted(expected), aggregate.geohashes.tolist())
+        for i, cell in enumerate(aggregate.geohashes.tolist()):
+            self.assertEqual(len(expected[cell]), aggregate.counts[i])
+            self.assertAlmostEqual(sum(expected[cell]), aggregate.sums[i], 9)
+            self.assertEqual(min(expected[cell]), aggregate.mins[i])
+            self.assertEqual(max(expected[cell]), aggregate.maxs[i])
+
+    def test_from_points(self):
+        lats, lons = random_points(2000, (41, 43), (-89, -86))
+        values = np.array([random.uniform(-10, 10) for _ in range(2000)])
+        self.assert_aggregate(CellAggregate.from_points(lats, lons, 20, values), lats, lons, values, 20)
+
+        counts = CellAggregate.from_points(lats, lons, 20)
+        np.testing.assert_array_equal(counts.counts, counts.sums)
+
+    def test_rollup(self):
+        lats, lons = random_points(2000, (41, 43), (-89, -86))
+        values = np.array([random.uniform(-10, 10) for _ in range(2000)])
+        aggregate = CellAggregate.from_points(lats, lons, 30, values)
+        for precision in (29, 20, 11, 0):
+            self.assert_aggregate(aggregate.rollup(precision), lats, lons, values, precision)
+
+        with self.assertRaises(ValueError):
+            aggregate.rollup(31)
+
+    def test_merge(self):
+        lats, lons = random_points(3000)
+        values = np.array([random.uniform(-10, 10) for _ in range(3000)])
+        parts = [
+            CellAggregate.from_points(lats[:1000], lons[:1000], 12, values[:1000]),
+            CellAggregate.from_points(lats[1000:2500], lons[1000:2500], 15, values[1000:2500]),
+            CellAggregate.from_points(lats[2500:], lons[2500:], 12, values[2500:]),
+            CellAggregate.build([], 20),
+        ]
+        self.assert_aggregate(CellAggregate.merge(parts), lats, lons, values, 12)
+
+        with self.assertRaises(ValueError):
+            CellAggregate.merge([])
+
+    def test_to_grid(self):
+        lats, lons = random_points(2000)
+        values = np.array([random.uniform(-10, 10) for _ in range(2000)])
+        aggregate = CellAggregate.from_points(lats, lons, 9, values)
+
+        counts = aggregate.to_grid()
+        self.assertEqual((16, 32), counts.shape)
+        self.assertEqual(2000, counts.sum())
+        maxs = aggregate.to_grid('max', fill_value=np.nan)
+        for cell, count, maximum in zip(aggregate.geohashes.tolist(), aggregate.counts, aggregate.maxs):
+            row, col = geohash.geohash_to_row_col(cell, 9)
+            self.assertEqual(count, counts[row, col])
+            self.assertEqual(maximum, maxs[row, col])
+        self.assertEqual(np.count_nonzero(counts), np.count_nonzero(~np.isnan(maxs)))
+
+        with self.assertRaises(ValueError):
+            aggregate.to_grid('median')
+
+    def test_to_grid_index_range_crosses_180(self):
+        lats, lons = random_points(2000)
+        aggregate = CellAggregate.from_points(lats, lons, 10)
+        full = aggregate.to_grid()
+
+        grid = aggregate.to_grid(index_range=CellIndexRange(row_start=10, row_end=20, col_start=30, col_count=4))
+        self.assertEqual((11, 4), grid.shape)
+        np.testing.assert_array_equal(full[10:21, [30, 31, 0, 1]], grid)
+
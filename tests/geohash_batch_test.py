@@ -0,0 +1,144 @@
+import random
+import unittest
+
+import numpy as np
+
+import geohash
+import geohash_batch
+from geohash import Coordinates
+
+
+class GeoHashBatchTest(unittest.TestCase):
+    def test_calc_geohashes(self):
+        lats = np.array([41.881832, -41.881832])
+        lons = np.array([-87.623177, -87.623177])
+
+        # Odd precision
+        result = geohash_batch.calc_geohashes(lats, lons, 25)
+        self.assertEqual(np.uint64, result.dtype)
+        self.assertEqual([13275030, geohash.calc_geohash(Coordinates(-41.881832, -87.623177), 25)], result.tolist())
+
+        # Even precision
+        result = geohash_batch.calc_geohashes(lats, lons, 20)
+        self.assertEqual([414844, geohash.calc_geohash(Coordinates(-41.881832, -87.623177), 20)], result.tolist())
+
+    def test_calc_geohashes_matches_scalar(self):
+        lats = [random.uniform(-90, 90) for _ in range(200)] + [-90, 90, 0, 45]
+        lons = [random.uniform(-180, 180) for _ in range(200)] + [-180, 180, 0, -90]
+        for precision in (0, 1, 5, 20, 25, 52, 63, 64):
+            expected = [geohash.calc_geohash(Coordinates(lat, lon), precision) for lat, lon in zip(lats, lons)]
+            result = geohash_batch.calc_geohashes(np.array(lats), np.array(lons), precision)
+            self.assertEqual(expected, result.tolist())
+
+    def test_calc_geohashes_from_points(self):
+        points = np.array([(41.881832, -87.623177)], dtype=geohash_batch.COORDINATES_DTYPE)
+        result = geohash_batch.calc_geohashes_from_points(points, 25)
+        self.assertEqual([13275030], result.tolist())
+
+    def test_calc_geohashes_invalid_precision(self):
+        with self.assertRaises(ValueError):
+            geohash_batch.calc_geohashes(np.zeros(1), np.zeros(1), 65)
+
+    def test_calc_cell_boundaries(self):
+        result = geohash_batch.calc_cell_boundaries(np.array([6300988, 6300988], dtype=np.uint64), 25)
+        self.assertEqual([-41.923828125] * 2, result.start_lat.tolist())
+        self.assertEqual([-41.8798828125] * 2, result.end_lat.tolist())
+        self.assertEqual([-87.626953125] * 2, result.start_lon.tolist())
+        self.assertEqual([-87.5830078125] * 2, result.end_lon.tolist())
+
+        result = geohash_batch.calc_cell_boundaries([196905], 20)
+        self.assertEqual([-42.01171875], result.start_lat.tolist())
+        self.assertEqual([-41.8359375], result.end_lat.tolist())
+        self.assertEqual([-87.890625], result.start_lon.tolist())
+        self.assertEqual([-87.5390625], result.end_lon.tolist())
+
+    def test_calc_cell_boundaries_matches_scalar(self):
+        for precision in (1, 5, 20, 25, 64):
+            ghashes = [random.getrandbits(precision) for _ in range(100)]
+            result = geohash_batch.calc_cell_boundaries(np.array(ghashes, dtype=np.uint64), precision)
+            for i, ghash in enumerate(ghashes):
+                boundary = geohash.calc_cell_boundary(ghash, precision)
+                self.assertEqual(boundary.start_lat, result.start_lat[i])
+                self.assertEqual(boundary.end_lat, result.end_lat[i])
+                self.assertEqual(boundary.start_lon, result.start_lon[i])
+                self.assertEqual(boundary.end_lon, result.end_lon[i])
+
+    def test_calc_cell_boundaries_to_structured(self):
+        result = geohash_batch.calc_cell_boundaries([196905], 20).to_structured()
+        self.assertEqual(geohash_batch.CELL_BOUNDARY_DTYPE, result.dtype)
+        self.assertEqual(-42.01171875, result['start_lat'][0])
+        self.assertEqual(-87.5390625, result['end_lon'][0])
+
+    def test_calc_cell_centers(self):
+        lats, lons = geohash_batch.calc_cell_centers([0b00110, 0b01100], 5)
+        self.assertEqual([-22.5, 22.5], lats.tolist())
+        self.assertEqual([-67.5, -67.5], lons.tolist())
+
+    def test_calc_distances_km(self):
+        start = Coordinates(41.881832, -87.623177)
+        lats = np.array([random.uniform(-90, 90) for _ in range(100)])
+        lons = np.array([random.uniform(-180, 180) for _ in range(100)])
+
+        result = geohash_batch.calc_distances_km(start.lat, start.lon, lats, lons)
+        self.assertEqual((100,), result.shape)
+        for i in range(100):
+            self.assertAlmostEqual(geohash.calc_distance_km(start, Coordinates(lats[i], lons[i])), result[i], 8)
+
+    def test_calc_distance_matrix_km(self):
+        lats1 = np.array([random.uniform(-90, 90) for _ in range(30)])
+        lons1 = np.array([random.uniform(-180, 180) for _ in range(30)])
+        lats2 = np.array([random.uniform(-90, 90) for _ in range(20)])
+        lons2 = np.array([random.uniform(-180, 180) for _ in range(20)])
+
+        # Small budget, so the matrix is built from many blocks
+        result = geohash_batch.calc_distance_matrix_km(lats1, lons1, lats2, lons2, max_chunk_bytes=2000)
+        self.assertEqual((30, 20), result.shape)
+        for i in range(30):
+            for j in range(20):
+                self.assertAlmostEqual(geohash.calc_distance_km(Coordinates(lats1[i], lons1[i]), Coordinates(lats2[j], lons2[j])), result[i, j], 8)
+
+    def test_iter_distance_matrix_chunks(self):
+        lats = np.zeros(10)
+        lons = np.arange(10.0)
+        chunks = list(geohash_batch.iter_distance_matrix_chunks(lats, lons, lats, lons, max_chunk_bytes=4 * 10 * 8 * 6))
+        self.assertEqual([0, 4, 8], [row_start for row_start, _ in chunks])
+        self.assertEqual([(4, 10), (4, 10), (2, 10)], [block.shape for _, block in chunks])
+
+    def test_calc_rows_cols(self):
+        lats = np.array([random.uniform(-90, 90) for _ in range(500)])
+        lons = np.array([random.uniform(-180, 180) for _ in range(500)])
+        for precision in (0, 1, 25, 40, 63, 64):
+            geohashes = geohash_batch.calc_geohashes(lats, lons, precision)
+            rows, cols = geohash_batch.calc_rows_cols(geohashes, precision)
+            for cell, row, col in zip(geohashes.tolist(), rows.tolist(), cols.tolist()):
+                self.assertEqual(geohash.geohash_to_row_col(cell, precision), (row, col))
+
+    def test_geohashes_to_base32(self):
+        geohashes = geohash_batch.calc_geohashes([57.64911, -41.881832], [10.40744, -87.623177], 55)
+        result = geohash_batch.geohashes_to_base32(geohashes, 55)
+        self.assertEqual(np.dtype('S11'), result.dtype)
+        self.assertEqual([geohash.geohash_to_base32(ghash, 55).encode() for ghash in geohashes.tolist()], result.tolist())
+        self.assertEqual(b'u4pruydqqvj', result[0])
+        with self.assertRaises(ValueError):
+            geohash_batch.geohashes_to_base32(geohashes, 56)
+
+    def test_base32_to_geohashes(self):
+        lats = np.array([random.uniform(-90, 90) for _ in range(500)])
+        lons = np.array([random.uniform(-180, 180) for _ in range(500)])
+        for precision in (5, 30, 60):
+            geohashes = geohash_batch.calc_geohashes(lats, lons, precision)
+            codes = geohash_batch.geohashes_to_base32(geohashes, precision)
+            np.testing.assert_array_equal(geohashes, geohash_batch.base32_to_geohashes(codes))
+            np.testing.assert_array_equal(geohashes, geohash_batch.base32_to_geohashes(codes.tobytes(), length=precision // 5))
+            np.testing.assert_array_equal(geohashes, geohash_batch.base32_to_geohashes([code.decode().upper() for code in codes]))
+
+    def test_base32_to_geohashes_invalid(self):
+        self.assertEqual(0, len(geohash_batch.base32_to_geohashes([])))
+        with self.assertRaises(ValueError):
+            geohash_batch.base32_to_geohashes(['u4pr', 'u4pru'])
+        with self.assertRaises(ValueError):
+            geohash_batch.base32_to_geohashes(['u4pa'])
+        with self.assertRaises(ValueError):
+            geohash_batch.base32_to_geohashes(b'u4pru', length=2)
+        with self.assertRaises(ValueError):
+            geohash_batch.base32_to_geohashes(['u4pruydqqvjzz'])
@@ -0,0 +1,34 @@
+import unittest
+
+import geohash_bench
+
+
+class GeohashBenchTest(unittest.TestCase):
+    def test_run_benchmarks(self):
+        report = geohash_bench.run_benchmarks('mid_latitude/p25', min_time=0.001, max_calls=10)
+        self.assertEqual(
+            {'calc_geohash/mid_latitude/p25', 'calc_cell_boundary/mid_latitude/p25', 'displace_cell/mid_latitude/p25',
+             'calc_cells_within_radius/mid_latitude/p25/r0.5', 'calc_cells_within_radius/mid_latitude/p25/r5',
+             'calc_cells_within_radius/mid_latitude/p25/r50'},
+            set(report['results']),
+        )
+        for result in report['results'].values():
+            self.assertLessEqual(result['calls'], 10)
+            self.assertGreater(result['ops_per_s'], 0)
+            self.assertLessEqual(result['latency_us']['p50'], result['latency_us']['p99'])
+
+    def test_compare_results(self):
+        baseline = {'results': {
+            'a': {'ops_per_s': 1000, 'peak_memory_kb': 10},
+            'b': {'ops_per_s': 1000, 'peak_memory_kb': 10},
+            'removed': {'ops_per_s': 1000, 'peak_memory_kb': 10},
+        }}
+        report = {'results': {
+            'a': {'ops_per_s': 950, 'peak_memory_kb': 10.5},
+            'b': {'ops_per_s': 800, 'peak_memory_kb': 20},
+            'added': {'ops_per_s': 1, 'peak_memory_kb': 1000},
+        }}
+
+        regressions = geohash_bench.compare_results(report, baseline, threshold=0.1)
+        self.assertEqual([('b', 'ops_per_s'), ('b', 'peak_memory_kb')], [(regression.case, regression.metric) for regression in regressions])
+        self.assertEqual([], geohash_bench.compare_results(report, baseline, threshold=1.5))
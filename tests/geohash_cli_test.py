@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+import geohash
+import geohash_cli
+from geohash import Coordinates
+from helpers import random_points
+
+
+def random_point_tuples(count: int) -> list[tuple[float, float]]:
+    lats, lons = random_points(count)
+    return list(zip(lats.tolist(), lons.tolist()))
+
+class GeohashCliTest(unittest.TestCase):
+    def test_encode_stream_csv(self):
+        points = random_point_tuples(250)
+        input_file = io.StringIO('id,lat,lon\n' + ''.join(f'{i},{lat},{lon}\n' for i, (lat, lon) in enumerate(points)))
+        output_file = io.StringIO()
+
+        row_count = geohash_cli.encode_stream(input_file, output_file, precision=25, chunk_size=100)
+
+        self.assertEqual(250, row_count)
+        rows = list(csv.reader(io.StringIO(output_file.getvalue())))
+        self.assertEqual(['id', 'lat', 'lon', 'geohash'], rows[0])
+        for i, (lat, lon) in enumerate(points):
+            self.assertEqual(str(i), rows[i + 1][0])
+            self.assertEqual(geohash.calc_geohash(Coordinates(float(rows[i + 1][1]), float(rows[i + 1][2])), 25), int(rows[i + 1][3]))
+
+    def test_encode_stream_ndjson_workers(self):
+        points = random_point_tuples(250)
+        input_file = io.StringIO(''.join(json.dumps({'id': i, 'latitude': lat, 'longitude': lon}) + '\n' for i, (lat, lon) in enumerate(points)))
+        output_file = io.StringIO()
+
+        row_count = geohash_cli.encode_stream(input_file, output_file, precision=40, file_format='ndjson', workers=2, chunk_size=30,
+                                              lat_column='latitude', lon_column='longitude', output_column='gh')
+
+        self.assertEqual(250, row_count)
+        records = [json.loads(line) for line in output_file.getvalue().splitlines()]
+        self.assertEqual(list(range(250)), [record['id'] for record in records])
+        for record, (lat, lon) in zip(records, points):
+            self.assertEqual(geohash.calc_geohash(Coordinates(lat, lon), 40), record['gh'])
+
+    def test_encode_stream_missing_column(self):
+        with self.assertRaises(ValueError):
+            geohash_cli.encode_stream(io.StringIO('lat,lng\n1,2\n'), io.StringIO(), precision=25)
+
+    def test_encode_stream_empty(self):
+        self.assertEqual(0, geohash_cli.encode_stream(io.StringIO(''), io.StringIO(), precision=25))
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'points.jsonl')
+            output_path = os.path.join(directory, 'encoded.jsonl')
+            with open(input_path, 'w') as f:
+                f.write('{"lat": 41.881832, "lon": -87.623177}\n')
+
+            stderr = io.StringIO()
+            with redirect_stderr(stderr):
+                geohash_cli.main([input_path, output_path, '--precision', '25', '--workers', '1'])
+
+            with open(output_path) as f:
+                self.assertEqual(13275030, json.loads(f.readline())['geohash'])
+            self.assertIn('Encoded 1 rows', stderr.getvalue())
+            self.assertIn('rows/s', stderr.getvalue())
@@ -0,0 +1,156 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import geohash
+from geohash import Coordinates
+from geohash_index import GeohashIndex
+from helpers import random_points
+
+
+class GeohashIndexTest(unittest.TestCase):
+    def test_build(self):
+        lats, lons = random_points(100)
+        index = GeohashIndex.build(lats, lons, ids=np.arange(100, 200))
+
+        self.assertEqual(100, len(index))
+        self.assertTrue(np.all(index.geohashes[:-1] <= index.geohashes[1:]))
+        for i in range(100):
+            original = index.ids[i] - 100
+            self.assertEqual(lats[original], index.lats[i])
+            self.assertEqual(geohash.calc_geohash(Coordinates(lats[original], lons[original]), index.precision), index.geohashes[i])
+
+    def test_build_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            GeohashIndex.build([0, 1], [0, 1], ids=[0])
+
+    def test_query_radius(self):
+        center = Coordinates(41.881832, -87.623177)
+        lats, lons = random_points(2000, (41.5, 42.3), (-88.1, -87.1))
+        index = GeohashIndex.build(lats, lons)
+
+        for radius in (0.5, 5, 20):
+            result = index.query_radius(center, radius)
+            expected = {i for i in range(2000) if geohash.calc_distance_km(center, Coordinates(lats[i], lons[i])) <= radius}
+            self.assertEqual(expected, set(result.ids.tolist()))
+            for point_id, distance in zip(result.ids, result.distances_km):
+                self.assertAlmostEqual(geohash.calc_distance_km(center, Coordinates(lats[point_id], lons[point_id])), distance, 9)
+
+    def test_query_radius_crosses_180(self):
+        center = Coordinates(-16.5, 179.9)
+        lats, lons = random_points(1000, (-17.5, -15.5), (-180, 180))
+        index = GeohashIndex.build(lats, lons)
+
+        result = index.query_radius(center, 80)
+        expected = {i for i in range(1000) if geohash.calc_distance_km(center, Coordinates(lats[i], lons[i])) <= 80}
+        self.assertEqual(expected, set(result.ids.tolist()))
+
+    def test_query_radius_empty(self):
+        index = GeohashIndex.build([], [])
+        self.assertEqual(0, len(index.query_radius(Coordinates(0, 0), 10).ids))
+
+    def test_query_bbox(self):
+        lats, lons = random_points(2000, (40, 44), (-90, -85))
+        index = GeohashIndex.build(lats, lons)
+
+        result = index.query_bbox(Coordinates(41, -88), Coordinates(42.5, -86.5))
+        expected = {i for i in range(2000) if 41 <= lats[i] <= 42.5 and -88 <= lons[i] <= -86.5}
+        self.assertEqual(expected, set(result.tolist()))
+
+    def test_query_bbox_crosses_180(self):
+        lats, lons = random_points(2000, (-20, 20), (-180, 180))
+        index = GeohashIndex.build(lats, lons)
+
+        result = index.query_bbox(Coordinates(-5, 170), Coordinates(5, -175))
+        expected = {i for i in range(2000) if -5 <= lats[i] <= 5 and (lons[i] >= 170 or lons[i] <= -175)}
+        self.assertEqual(expected, set(result.tolist()))
+
+    def assert_nearest(self, index: GeohashIndex, lats, lons, point: Coordinates, k: int, **kwargs):
+        result = index.query_nearest(point, k, **kwargs)
+        distances = sorted(geohash.calc_distance_km(point, Coordinates(lat, lon)) for lat, lon in zip(lats, lons))
+        self.assertEqual(min(k, len(distances)), len(result.ids))
+        for expected, actual in zip(distances, result.distances_km):
+            self.assertAlmostEqual(expected, actual, 9)
+        for point_id, distance in zip(result.ids, result.distances_km):
+            self.assertAlmostEqual(geohash.calc_distance_km(point, Coordinates(lats[point_id], lons[point_id])), distance, 9)
+
+    def test_query_nearest(self):
+        lats, lons = random_points(3000, (41, 43), (-89, -86))
+        index = GeohashIndex.build(lats, lons)
+        for k in (1, 10, 100):
+            self.assert_nearest(index, lats, lons, Coordinates(41.881832, -87.623177), k)
+        self.assert_nearest(index, lats, lons, Coordinates(41.881832, -87.623177), 10, cell_precision=30)
+
+    def test_query_nearest_crosses_180(self):
+        lats, lons = random_points(500, (-20, 20), (175, 180))
+        east_lats, east_lons = random_points(500, (-20, 20), (-180, -175))
+        lats = np.concatenate([lats, east_lats])
+        lons = np.concatenate([lons, east_lons])
+        index = GeohashIndex.build(lats, lons)
+        self.assert_nearest(index, lats, lons, Coordinates(0, 179.99), 50)
+        self.assert_nearest(index, lats, lons, Coordinates(0, -179.99), 50, cell_precision=20)
+
+    def test_query_nearest_fewer_points_than_k(self):
+        lats, lons = random_points(20)
+        index = GeohashIndex.build(lats, lons)
+        self.assert_nearest(index, lats, lons, Coordinates(89, 10), 50)
+        self.assertEqual(0, len(GeohashIndex.build([], []).query_nearest(Coordinates(0, 0), 5).ids))
+
+    def test_save_and_open(self):
+        lats, lons = random_points(1000, (41.5, 42.3), (-88.1, -87.1))
+        index = GeohashIndex.build(lats, lons, ids=np.arange(1000) * 10)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'points.ghix')
+            index.save(path)
+            mapped_index = GeohashIndex.open(path)
+
+            self.assertEqual(index.precision, mapped_index.precision)
+            self.assertEqual(len(index), len(mapped_index))
+            self.assertFalse(mapped_index.geohashes.flags.writeable)
+            np.testing.assert_array_equal(index.geohashes, mapped_index.geohashes)
+            np.testing.assert_array_equal(index.lats, mapped_index.lats)
+            np.testing.assert_array_equal(index.lons, mapped_index.lons)
+            np.testing.assert_array_equal(index.ids, mapped_index.ids)
+
+            center = Coordinates(41.881832, -87.623177)
+            self.assertEqual(set(index.query_radius(center, 10).ids.tolist()), set(mapped_index.query_radius(center, 10).ids.tolist()))
+
+    def test_build_file(self):
+        lats, lons = random_points(100)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'points.ghix')
+            index = GeohashIndex.build_file(path, lats, lons, precision=40)
+            self.assertEqual(40, index.precision)
+            self.assertEqual(100, len(index))
+            self.assertEqual(64 + 100 * 32, os.path.getsize(path))
+
+    def test_open_invalid_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'points.ghix')
+            with open(path, 'wb') as f:
+                f.write(b'\0' * 64)
+            with self.assertRaises(ValueError):
+                GeohashIndex.open(path)
+
+            GeohashIndex.build(*random_points(10)).save(path)
+            with open(path, 'r+b') as f:
+                f.truncate(100)
+            with self.assertRaises(ValueError):
+                GeohashIndex.open(path)
+
+    def test_save_and_open_empty(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'points.ghix')
+            GeohashIndex.build([], []).save(path)
+            self.assertEqual(0, len(GeohashIndex.open(path).query_radius(Coordinates(0, 0), 10).ids))
+
+    def test_query_cells(self):
+        center = Coordinates(41.881832, -87.623177)
+        lats, lons = random_points(1000, (41.5, 42.3), (-88.1, -87.1))
+        index = GeohashIndex.build(lats, lons)
+
+        cells = set(geohash.calc_cells_within_radius(center, precision=25, radius=5))
+        expected = {i for i in range(1000) if geohash.calc_geohash(Coordinates(lats[i], lons[i]), 25) in cells}
+        self.assertEqual(expected, set(index.query_cells(list(cells), 25).tolist()))
@@ -0,0 +1,55 @@
+import random
+import unittest
+
+import numpy as np
+
+import geohash
+from geohash import Coordinates
+from geohash_join import geofence_join
+from helpers import random_points
+
+
+class GeohashJoinTest(unittest.TestCase):
+    def assert_join(self, center_lats, center_lons, radii, point_lats, point_lons, **kwargs):
+        result = geofence_join(center_lats, center_lons, radii, point_lats, point_lons, center_ids=np.arange(len(center_lats)) + 1000, **kwargs)
+
+        radii = np.broadcast_to(radii, center_lats.shape)
+        expected = {}
+        for center in range(len(center_lats)):
+            for point in range(len(point_lats)):
+                distance = geohash.calc_distance_km(Coordinates(center_lats[center], center_lons[center]), Coordinates(point_lats[point], point_lons[point]))
+                if distance <= radii[center]:
+                    expected[(center + 1000, point)] = distance
+
+        actual = {(center_id, point_id): distance for center_id, point_id, distance in zip(result.center_ids.tolist(), result.point_ids.tolist(), result.distances_km.tolist())}
+        self.assertEqual(len(result.center_ids), len(actual))
+        self.assertEqual(expected.keys(), actual.keys())
+        for key, distance in expected.items():
+            self.assertAlmostEqual(distance, actual[key], 9)
+
+    def test_geofence_join(self):
+        center_lats, center_lons = random_points(40, (41, 43), (-89, -86))
+        point_lats, point_lons = random_points(1500, (41, 43), (-89, -86))
+        radii = np.array([random.uniform(1, 30) for _ in range(40)])
+        self.assert_join(center_lats, center_lons, radii, point_lats, point_lons)
+
+        # Small chunks, so candidates are filtered in several passes
+        self.assert_join(center_lats, center_lons, radii, point_lats, point_lons, max_candidates_per_chunk=50)
+
+    def test_geofence_join_crosses_180(self):
+        center_lats, center_lons = random_points(10, (-5, 5), (179, 180))
+        point_lats, point_lons = random_points(1000, (-6, 6), (-180, 180))
+        point_lons[:500] = np.array([random.uniform(178, 180) for _ in range(500)])
+        point_lons[500:] = np.array([random.uniform(-180, -178) for _ in range(500)])
+        self.assert_join(center_lats, center_lons, 150, point_lats, point_lons)
+
+    def test_geofence_join_workers(self):
+        center_lats, center_lons = random_points(30, (41, 43), (-89, -86))
+        point_lats, point_lons = random_points(1000, (41, 43), (-89, -86))
+        radii = np.array([random.uniform(1, 30) for _ in range(30)])
+        self.assert_join(center_lats, center_lons, radii, point_lats, point_lons, workers=2)
+
+    def test_geofence_join_no_matches(self):
+        result = geofence_join([0], [0], [1], [45], [45])
+        self.assertEqual(0, len(result.center_ids))
+        self.assertEqual(0, len(result.point_ids))
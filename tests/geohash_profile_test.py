@@ -0,0 +1,53 @@
+import json
+import unittest
+
+import geohash
+from geohash import Coordinates
+from geohash_profile import RADIUS_QUERY_PHASES, RadiusQueryProfiler, profile_radius_queries
+
+
+class GeohashProfileTest(unittest.TestCase):
+    def test_profile_radius_queries(self):
+        point = Coordinates(41.881832, -87.623177)
+        with profile_radius_queries() as profiler:
+            cells = geohash.calc_cells_within_radius(point, 30, 5)
+            geohash.calc_cells_within_radius(point, 30, 5)
+
+        stats = profiler.stats()
+        self.assertEqual(2, stats['queries'])
+        self.assertEqual(2 * len(cells), stats['cells'])
+        self.assertEqual(set(RADIUS_QUERY_PHASES), set(stats['phases']))
+        for phase in stats['phases'].values():
+            self.assertEqual(2, phase['calls'])
+            self.assertGreaterEqual(phase['total_s'], phase['max_s'])
+
+        west, east = stats['phases']['west'], stats['phases']['east']
+        north, south = stats['phases']['north'], stats['phases']['south']
+        row_cells = 1 + (west['iterations'] + east['iterations']) // 2
+        self.assertEqual((north['iterations'] + south['iterations']) * row_cells, north['cells'] + south['cells'])
+        self.assertEqual(2 + west['iterations'] + east['iterations'] + north['iterations'] + south['iterations'], stats['decode_calls'])
+        json.dumps(stats)
+
+    def test_disabled_outside_context(self):
+        with profile_radius_queries() as profiler:
+            pass
+        geohash.calc_cells_within_radius(Coordinates(0, 0), 25, 5)
+        self.assertEqual(0, profiler.stats()['queries'])
+        self.assertIsNone(geohash._radius_query_profiler)
+
+    def test_trace_events(self):
+        profiler = RadiusQueryProfiler(trace_every=3)
+        with profile_radius_queries(profiler):
+            for _ in range(7):
+                geohash.calc_cells_within_radius(Coordinates(0, 0), 25, 5)
+
+        events = profiler.trace()['traceEvents']
+        # Queries 3 and 6, each with its phases and the whole query
+        self.assertEqual(2 * (len(RADIUS_QUERY_PHASES) + 1), len(events))
+        self.assertEqual(2, sum(event['name'] == 'radius_query' for event in events))
+        self.assertTrue(all(event['ph'] == 'X' and event['dur'] >= 0 for event in events))
+        json.dumps(profiler.trace())
+
+        profiler.reset()
+        self.assertEqual(0, profiler.stats()['queries'])
+        self.assertEqual([], profiler.trace_events)
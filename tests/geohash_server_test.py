@@ -0,0 +1,140 @@
+import asyncio
+import json
+import math
+import unittest
+
+import geohash
+from geohash import Coordinates
+from geohash_server import EncodeRequest, GeohashService, MicroBatcher, encode_batch, start_server
+
+
+class GeohashServerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_encode(self):
+        service = GeohashService(batch_window=0.01)
+        points = [(41.881832, -87.623177, 25), (-41.881832, -87.623177, 25), (10.5, 20.25, 40)]
+
+        results = await asyncio.gather(*(service.encode(lat, lon, precision) for lat, lon, precision in points))
+
+        self.assertEqual([geohash.calc_geohash(Coordinates(lat, lon), precision) for lat, lon, precision in points], results)
+        stats = service.stats()['encode']
+        self.assertEqual(3, stats['requests'])
+        self.assertEqual(1, stats['batches'])
+        self.assertIsNotNone(stats['latency_ms']['p99'])
+
+    async def test_cells_within_radius(self):
+        service = GeohashService(batch_window=0.01)
+        point = Coordinates(41.881832, -87.623177)
+
+        results = await asyncio.gather(*(service.cells_within_radius(point, precision, 5) for precision in (25, 25, 30)))
+
+        self.assertEqual(geohash.calc_cells_within_radius(point, 25, 5), results[0])
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(geohash.calc_cells_within_radius(point, 30, 5), results[2])
+
+    async def test_max_batch_size(self):
+        batches = []
+        def process_batch(items):
+            batches.append(items)
+            return [item * 2 for item in items]
+        batcher = MicroBatcher(process_batch, batch_window=0.05, max_batch_size=4)
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+        self.assertEqual([i * 2 for i in range(10)], results)
+        self.assertEqual([[0, 1, 2, 3], [4, 5, 6, 7]], batches[:2])
+        self.assertEqual(3, batcher.stats()['batches'])
+        self.assertEqual(10 / 3, batcher.stats()['mean_batch_size'])
+
+    async def test_batch_error(self):
+        def process_batch(items):
+            raise ValueError('bad batch')
+        batcher = MicroBatcher(process_batch, batch_window=0.001)
+
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(2, batcher.stats()['errors'])
+
+    async def test_item_error_fails_only_its_caller(self):
+        def process_batch(items):
+            return [ValueError(f'bad item {item}') if item < 0 else item * 2 for item in items]
+        batcher = MicroBatcher(process_batch, batch_window=0.01)
+
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(-1), batcher.submit(3), return_exceptions=True)
+
+        self.assertEqual(2, results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(6, results[2])
+        self.assertEqual(1, batcher.stats()['batches'])
+        self.assertEqual(1, batcher.stats()['errors'])
+
+    def test_encode_batch_invalid_precision(self):
+        results = encode_batch([EncodeRequest(41.881832, -87.623177, 25), EncodeRequest(1, 2, 70), EncodeRequest(1, 2, 25)])
+        self.assertEqual(13275030, results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(geohash.calc_geohash(Coordinates(1, 2), 25), results[2])
+
+    async def test_invalid_requests(self):
+        service = GeohashService(batch_window=0.01, max_radius_cells=1000)
+        point = Coordinates(41.881832, -87.623177)
+
+        results = await asyncio.gather(
+            service.encode(41.881832, -87.623177, 25),
+            service.encode(1, 2, 70),
+            service.cells_within_radius(point, 25, 5),
+            service.cells_within_radius(point, 25, math.inf),
+            service.cells_within_radius(point, 64, 1000),
+            return_exceptions=True,
+        )
+
+        self.assertEqual(13275030, results[0])
+        self.assertEqual(geohash.calc_cells_within_radius(point, 25, 5), results[2])
+        for result in results[1], results[3], results[4]:
+            self.assertIsInstance(result, ValueError)
+        self.assertEqual(0, service.stats()['encode']['errors'])
+        self.assertEqual(1, service.stats()['radius']['requests'])
+
+    async def test_coarse_query_crossing_180(self):
+        service = GeohashService(batch_window=0.01)
+        point = Coordinates(41.881832, -87.623177)
+
+        results = await asyncio.wait_for(asyncio.gather(
+            service.cells_within_radius(Coordinates(-86.03, -179.9159), 2, 5),
+            service.cells_within_radius(point, 25, 5),
+        ), timeout=10)
+
+        self.assertEqual([0, 2], results[0])
+        self.assertEqual(geohash.calc_cells_within_radius(point, 25, 5), results[1])
+        self.assertEqual(1, service.stats()['radius']['batches'])
+
+    async def get(self, port: int, target: str) -> tuple[str, dict]:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, body = response.split(b'\r\n\r\n', 1)
+        return head.split(b'\r\n')[0].decode(), json.loads(body)
+
+    async def test_http_server(self):
+        service = GeohashService(batch_window=0.001)
+        server = await start_server(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            status, body = await self.get(port, '/encode?lat=41.881832&lon=-87.623177&precision=25')
+            self.assertEqual('HTTP/1.1 200 OK', status)
+            self.assertEqual(13275030, body['geohash'])
+
+            status, body = await self.get(port, '/radius?lat=41.881832&lon=-87.623177&precision=25&radius=5')
+            self.assertEqual(geohash.calc_cells_within_radius(Coordinates(41.881832, -87.623177), 25, 5), body['cells'])
+
+            status, body = await self.get(port, '/stats')
+            self.assertEqual(1, body['encode']['requests'])
+            self.assertEqual(1, body['radius']['requests'])
+
+            status, _ = await self.get(port, '/encode?lat=41.881832')
+            self.assertEqual('HTTP/1.1 400 Bad Request', status)
+            status, _ = await self.get(port, '/radius?lat=41.881832&lon=-87.623177&precision=64&radius=1000')
+            self.assertEqual('HTTP/1.1 400 Bad Request', status)
+            status, _ = await self.get(port, '/unknown')
+            self.assertEqual('HTTP/1.1 404 Not Found', status)
@@ -306,3 +306,313 @@ class GeoHashTest(unittest.TestCase):
         results = geohash.calc_cells_within_radius(point, precision=25, radius=5)
 
         self.assertEqual({13275030, 13275027, 13275026, 13275031, 13275036, 13275033, 13275032, 13275037, 13275028, 13275025, 13275024, 13275029}, set(results))
+
+    def test_geohash_to_row_col(self):
+        self.assertEqual((3, 0), geohash.geohash_to_row_col(0b0101, 4))
+        self.assertEqual((3, 7), geohash.geohash_to_row_col(0b11111, 5))
+        self.assertEqual((2**32 - 1, 2**32 - 1), geohash.geohash_to_row_col(2**64 - 1, 64))
+        self.assertEqual((0, 2**32 - 1), geohash.geohash_to_row_col(0xAAAAAAAAAAAAAAAA, 64))
+
+    def test_row_col_to_geohash(self):
+        self.assertEqual(0b0101, geohash.row_col_to_geohash(3, 0, 4))
+        self.assertEqual(0b11111, geohash.row_col_to_geohash(3, 7, 5))
+        self.assertEqual(0xAAAAAAAAAAAAAAAA, geohash.row_col_to_geohash(0, 2**32 - 1, 64))
+
+    def test_row_col_round_trip(self):
+        for precision in (1, 20, 25, 63, 64, 65):
+            ghash = random.getrandbits(precision)
+            row_col = geohash.geohash_to_row_col(ghash, precision)
+            self.assertEqual(ghash, geohash.row_col_to_geohash(*row_col, precision))
+
+    def test_displace_cell_wraps_east_west(self):
+        # Westmost column displaced west is the eastmost column
+        self.assertEqual(0b10101, geohash.displace_cell(0b00000, 5, 0, -1))
+        self.assertEqual(0b00000, geohash.displace_cell(0b10101, 5, 0, 1))
+
+    def test_displace_row_col(self):
+        self.assertEqual((1, 7), geohash.displace_row_col((0, 0), 5, 1, -1))
+        self.assertEqual(geohash.geohash_to_row_col(geohash.displace_cell(13275030, 25, 2, -3), 25),
+                         geohash.displace_row_col(geohash.geohash_to_row_col(13275030, 25), 25, 2, -3))
+
+    def test_calc_min_distance_to_cell_km(self):
+        point = Coordinates(41.881832, -87.623177)
+        ghash = geohash.calc_geohash(point, 25)
+        self.assertEqual(0, geohash.calc_min_distance_to_cell_km(point, ghash, 25))
+
+        # Cell due north: distance is to its south edge
+        north_ghash = geohash.displace_cell(ghash, 25, 2, 0)
+        boundary = geohash.calc_cell_boundary(north_ghash, 25)
+        expected = geohash.calc_distance_km(point, Coordinates(boundary.start_lat, point.lon))
+        self.assertAlmostEqual(expected, geohash.calc_min_distance_to_cell_km(point, north_ghash, 25), 9)
+
+        # Across the antimeridian
+        point = Coordinates(0, 179.9)
+        ghash = geohash.calc_geohash(Coordinates(0, -179.9), 25)
+        self.assertLess(geohash.calc_min_distance_to_cell_km(point, ghash, 25), 23)
+
+    def test_calc_cap_index_range(self):
+        point = Coordinates(41.881832, -87.623177)
+        index_range = geohash.calc_cap_index_range(point, 25, 5)
+        row, col = geohash.geohash_to_row_col(geohash.calc_geohash(point, 25), 25)
+        self.assertLessEqual(index_range.row_start, row)
+        self.assertGreaterEqual(index_range.row_end, row)
+        self.assertEqual(col - 2, index_range.col_start)
+        self.assertEqual(4, index_range.col_count)
+
+        # Covers the north pole, so every col
+        index_range = geohash.calc_cap_index_range(Coordinates(89.99, 10), 25, 5)
+        self.assertEqual(0, index_range.col_start)
+        self.assertEqual(2**13, index_range.col_count)
+        self.assertEqual(2**12 - 1, index_range.row_end)
+
+    def test_calc_cells_within_circle(self):
+        point = Coordinates(41.881832, -87.623177)
+        result: geohash.CircleCells = geohash.calc_cells_within_circle(point, precision=25, radius=50)
+        rectangle_cells = set(geohash.calc_cells_within_radius(point, precision=25, radius=50))
+
+        self.assertEqual(len(result.cells), len(set(result.cells)))
+        self.assertGreater(result.pruned_count, 0)
+        self.assertLess(len(result.cells), len(rectangle_cells))
+        for cell in result.cells:
+            self.assertLessEqual(geohash.calc_min_distance_to_cell_km(point, cell, 25), 50)
+
+    def test_calc_cells_within_circle_contains_points_in_circle(self):
+        for lat, lon in ((41.881832, -87.623177), (0, 179.95), (-65, -179.99), (89.9, 0)):
+            point = Coordinates(lat, lon)
+            cells = set(geohash.calc_cells_within_circle(point, precision=20, radius=100).cells)
+            for _ in range(200):
+                test_point = geohash.displace_point(point, random.uniform(0, 100), random.uniform(0, 2 * math.pi))
+                test_point.lon = (test_point.lon + 180) % 360 - 180
+                self.assertIn(geohash.calc_geohash(test_point, 20), cells)
+
+    def test_cells_to_ranges(self):
+        self.assertEqual([], geohash.cells_to_ranges([]))
+        self.assertEqual([(3, 6), (8, 9), (12, 14)], geohash.cells_to_ranges([13, 5, 4, 8, 3, 12, 4]))
+
+        # Merges the smallest gap first
+        self.assertEqual([(3, 9), (12, 14)], geohash.cells_to_ranges([13, 5, 4, 8, 3, 12], max_ranges=2))
+        self.assertEqual([(3, 14)], geohash.cells_to_ranges([13, 5, 4, 8, 3, 12], max_ranges=1))
+
+        with self.assertRaises(ValueError):
+            geohash.cells_to_ranges([1], max_ranges=0)
+
+    def test_cells_to_ranges_parent_cell(self):
+        # All four children of 0b101 at precision 5
+        self.assertEqual([(0b10100, 0b11000)], geohash.cells_to_ranges([0b10100, 0b10101, 0b10110, 0b10111]))
+
+    def test_calc_ranges_within_radius(self):
+        point = Coordinates(41.881832, -87.623177)
+        cells = geohash.calc_cells_within_circle(point, precision=25, radius=50).cells
+        ranges = geohash.calc_ranges_within_radius(point, precision=25, radius=50)
+
+        self.assertLess(len(ranges), len(cells))
+        self.assertEqual(sorted(cells), [cell for lo, hi in ranges for cell in range(lo, hi)])
+
+        bounded_ranges = geohash.calc_ranges_within_radius(point, precision=25, radius=50, max_ranges=10)
+        self.assertEqual(10, len(bounded_ranges))
+        for cell in cells:
+            self.assertTrue(any(lo <= cell < hi for lo, hi in bounded_ranges))
+
+        storage_ranges = geohash.calc_ranges_within_radius(point, precision=25, radius=50, storage_precision=30)
+        self.assertEqual([(lo << 5, hi << 5) for lo, hi in ranges], storage_ranges)
+
+    def test_iter_cells_within_radius(self):
+        point = Coordinates(41.881832, -87.623177)
+        cells = geohash.iter_cells_within_radius(point, precision=25, radius=5)
+
+        self.assertEqual(13275030, next(cells))
+        self.assertEqual({13275030, 13275027, 13275026, 13275031, 13275036, 13275033, 13275032, 13275037, 13275028, 13275025, 13275024, 13275029}, {13275030, *cells})
+
+    def test_iter_cells_within_radius_matches_list(self):
+        point = Coordinates(-33.8688, 151.2093)
+        self.assertEqual(geohash.calc_cells_within_radius(point, precision=30, radius=20),
+                         list(geohash.iter_cells_within_radius(point, precision=30, radius=20)))
+
+    def test_calc_cells_within_radius_of_cell(self):
+        cell = geohash.calc_geohash(Coordinates(41.881832, -87.623177), 25)
+        cells = set(geohash.calc_cells_within_radius_of_cell(cell, precision=25, radius=10))
+
+        boundary = geohash.calc_cell_boundary(cell, 25)
+        for lat in (boundary.start_lat, boundary.end_lat):
+            for lon in (boundary.start_lon, boundary.end_lon):
+                self.assertLessEqual(set(geohash.calc_cells_within_circle(Coordinates(lat, lon), 25, 10).cells), cells)
+
+    def test_radius_query_cache(self):
+        cache = geohash.RadiusQueryCache(max_size=2)
+        point = Coordinates(41.881832, -87.623177)
+        nearby_point = Coordinates(41.8819, -87.6232)
+        far_point = Coordinates(-33.8688, 151.2093)
+
+        cells = cache.get_cells(point, precision=25, radius=5)
+        self.assertLessEqual(set(geohash.calc_cells_within_circle(point, 25, 5).cells), set(cells))
+        self.assertIs(cells, cache.get_cells(nearby_point, precision=25, radius=5))
+        self.assertEqual(geohash.CacheStats(hits=1, misses=1, evictions=0, size=1), cache.stats)
+
+        cache.get_cells(point, precision=25, radius=6)
+        cache.get_cells(far_point, precision=25, radius=5)
+        self.assertEqual(geohash.CacheStats(hits=1, misses=3, evictions=1, size=2), cache.stats)
+
+        # Least recently used entry was evicted
+        cache.get_cells(point, precision=25, radius=5)
+        self.assertEqual(4, cache.stats.misses)
+
+        cache.clear()
+        self.assertEqual(geohash.CacheStats(), cache.stats)
+
+    def test_calc_cells_within_bbox(self):
+        # Precision 5 cells are 45 degrees tall and wide
+        cells = geohash.calc_cells_within_bbox(Coordinates(-10, -100), Coordinates(10, -80), 5)
+        self.assertEqual({0b00011, 0b00110, 0b01001, 0b01100}, set(cells))
+
+    def test_calc_cells_within_bbox_crosses_180(self):
+        cells = geohash.calc_cells_within_bbox(Coordinates(10, 170), Coordinates(20, -170), 5)
+        self.assertEqual({0b11101, 0b01000}, set(cells))
+
+        index_range = geohash.calc_bbox_index_range(Coordinates(10, 170), Coordinates(20, 160), 5)
+        self.assertEqual(8, index_range.col_count)
+
+    def test_slotted_dataclasses(self):
+        point = Coordinates(41.881832, -87.623177)
+        self.assertFalse(hasattr(point, '__dict__'))
+        with self.assertRaises(AttributeError):
+            point.altitude = 10
+
+    def test_calc_geohash_lat_lon(self):
+        self.assertEqual(13275030, geohash.calc_geohash_lat_lon(41.881832, -87.623177, 25))
+        self.assertEqual(414844, geohash.calc_geohash_lat_lon(41.881832, -87.623177, 20))
+
+    def test_calc_cell_bounds(self):
+        self.assertEqual((-41.923828125, -41.8798828125, -87.626953125, -87.5830078125), geohash.calc_cell_bounds(6300988, 25))
+        self.assertEqual((-42.01171875, -41.8359375, -87.890625, -87.5390625), geohash.calc_cell_bounds(196905, 20))
+
+    def test_calc_cell_bounds_high_precision(self):
+        for precision in (64, 65, 80):
+            ghash = geohash.calc_geohash(Coordinates(41.881832, -87.623177), precision)
+            start_lat, end_lat, start_lon, end_lon = geohash.calc_cell_bounds(ghash, precision)
+            self.assertLessEqual(start_lat, 41.881832)
+            self.assertGreater(end_lat, 41.881832)
+            self.assertLessEqual(start_lon, -87.623177)
+            self.assertGreater(end_lon, -87.623177)
+
+    def test_displace_lat_lon(self):
+        end_lat, end_lon = geohash.displace_lat_lon(41.881832, -87.623177, 1.0, math.pi / 2)
+        end_coords: Coordinates = geohash.displace_point(Coordinates(41.881832, -87.623177), 1.0, math.pi / 2)
+        self.assertEqual((end_coords.lat, end_coords.lon), (end_lat, end_lon))
+
+    def test_calc_distance_km_lat_lon(self):
+        self.assertAlmostEqual(1.0, geohash.calc_distance_km_lat_lon(41.881832, -87.623177, 41.890825216059184, -87.623177), 5)
+
+    def test_radius_cover_tracker(self):
+        tracker = geohash.RadiusCoverTracker(precision=25, radius=5)
+        self.assertEqual([], tracker.cells)
+
+        point = Coordinates(41.881832, -87.623177)
+        delta: geohash.CoverDelta = tracker.update(point)
+        self.assertEqual([], delta.removed)
+        self.assertEqual(set(geohash.calc_cells_within_circle(point, 25, 5).cells) - set(delta.added), set())
+        cells = set(delta.added)
+
+        # Same point again: nothing changes
+        self.assertEqual(geohash.CoverDelta(added=[], removed=[]), tracker.update(point))
+
+        for _ in range(20):
+            point = geohash.displace_point(point, random.uniform(0, 3), random.uniform(0, 2 * math.pi))
+            delta = tracker.update(point)
+            self.assertEqual(set(), set(delta.added) & cells)
+            self.assertLessEqual(set(delta.removed), cells)
+            cells = (cells - set(delta.removed)) | set(delta.added)
+            self.assertEqual(set(tracker.cells), cells)
+
+    def test_radius_cover_tracker_crosses_180(self):
+        tracker = geohash.RadiusCoverTracker(precision=20, radius=50)
+        tracker.update(Coordinates(10, 179.9))
+        cells = set(tracker.cells)
+
+        delta = tracker.update(Coordinates(10, -179.5))
+        cells = (cells - set(delta.removed)) | set(delta.added)
+        self.assertEqual(set(tracker.cells), cells)
+        self.assertLess(len(delta.added), len(cells))
+
+    def test_estimate_cover(self):
+        point = Coordinates(41.881832, -87.623177)
+        for precision in (20, 25, 30, 35):
+            estimate = geohash.estimate_cover(point, precision, 5)
+            self.assertEqual(precision, estimate.precision)
+            self.assertGreaterEqual(estimate.cell_count, len(geohash.calc_cells_within_radius(point, precision, 5)))
+            self.assertGreater(estimate.overscan_area_km2, 0)
+
+        # Circles reaching poleward of their own latitude band cover narrower cells
+        for precision in (20, 25):
+            high_point = Coordinates(79.9, 10)
+            index_range = geohash.calc_cap_index_range(high_point, precision, 1000)
+            cap_cells = (index_range.row_end - index_range.row_start + 1) * index_range.col_count
+            self.assertGreaterEqual(geohash.estimate_cover(high_point, precision, 1000).cell_count, cap_cells)
+
+        self.assertEqual(1, geohash.estimate_cover(point, 0, 5).cell_count)
+        with self.assertRaises(ValueError):
+            geohash.estimate_cover(point, geohash.MAX_TABLE_PRECISION + 1, 5)
+
+    def test_choose_precision(self):
+        point = Coordinates(41.881832, -87.623177)
+        estimate = geohash.choose_precision(point, 5, max_cells=100)
+        self.assertLessEqual(estimate.cell_count, 100)
+        self.assertGreater(geohash.estimate_cover(point, estimate.precision + 1, 5).cell_count, 100)
+
+        self.assertEqual(20, geohash.choose_precision(point, 5, max_cells=100, max_precision=20).precision)
+        self.assertEqual(0, geohash.choose_precision(point, 5, max_cells=0).precision)
+
+        # Near the pole whole rows of cells are covered
+        polar = geohash.choose_precision(Coordinates(89.9, 0), 100, max_cells=1000)
+        self.assertLessEqual(polar.cell_count, 1000)
+
+    def test_geohash_to_base32(self):
+        ghash = geohash.calc_geohash(Coordinates(57.64911, 10.40744), 55)
+        self.assertEqual('u4pruydqqvj', geohash.geohash_to_base32(ghash, 55))
+        self.assertEqual('u4pru', geohash.geohash_to_base32(ghash >> 30, 25))
+        self.assertEqual('', geohash.geohash_to_base32(0, 0))
+        with self.assertRaises(ValueError):
+            geohash.geohash_to_base32(ghash, 54)
+
+    def test_base32_to_geohash(self):
+        ghash = geohash.calc_geohash(Coordinates(57.64911, 10.40744), 55)
+        self.assertEqual(ghash, geohash.base32_to_geohash('u4pruydqqvj'))
+        self.assertEqual(ghash, geohash.base32_to_geohash('U4PRUYDQQVJ'))
+        self.assertEqual(0, geohash.base32_to_geohash(''))
+        for text in ('u4pa', 'u4 p', '-u4p', 'u4p_r'):
+            with self.assertRaises(ValueError):
+                geohash.base32_to_geohash(text)
+
+        for _ in range(200):
+            precision = random.randrange(5, 100, 5)
+            ghash = random.getrandbits(precision)
+            self.assertEqual(ghash, geohash.base32_to_geohash(geohash.geohash_to_base32(ghash, precision)))
+
+    def test_base32_prefix_range(self):
+        lo, hi = geohash.base32_prefix_range('u4p', 25)
+        self.assertEqual((geohash.base32_to_geohash('u4p00'), geohash.base32_to_geohash('u4pzz') + 1), (lo, hi))
+        self.assertEqual((0, 1 << 10), geohash.base32_prefix_range('', 10))
+        with self.assertRaises(ValueError):
+            geohash.base32_prefix_range('u4pru', 20)
+
+    def test_base32_prefix_upper_bound(self):
+        self.assertEqual('u4q', geohash.base32_prefix_upper_bound('u4p'))
+        self.assertEqual('u5', geohash.base32_prefix_upper_bound('u4z'))
+        self.assertEqual('ub', geohash.base32_prefix_upper_bound('u9'))
+        self.assertIsNone(geohash.base32_prefix_upper_bound('zz'))
+        self.assertTrue('u4p' <= 'u4pzzz' < geohash.base32_prefix_upper_bound('u4p'))
+
+    def test_range_to_base32(self):
+        ranges = geohash.calc_ranges_within_radius(Coordinates(41.881832, -87.623177), 30, 5)
+        for lo, hi in ranges:
+            start, end = geohash.range_to_base32(lo, hi, 30)
+            self.assertEqual(geohash.geohash_to_base32(lo, 30), start)
+            self.assertLess(geohash.geohash_to_base32(hi - 1, 30), end)
+        self.assertEqual(('zz', None), geohash.range_to_base32((1 << 10) - 1, 1 << 10, 10))
+
+    def test_calc_cells_within_radius_wraps_at_coarse_precision(self):
+        # The west/east walk covers every col of the row and stops instead of circling the globe
+        cells = geohash.calc_cells_within_radius(Coordinates(-86.03, -179.9159), 2, 5)
+        self.assertEqual([0, 2], cells)
+        for precision in (1, 2, 3):
+            cells = geohash.calc_cells_within_radius(Coordinates(89, 179.99), precision, 3000)
+            self.assertEqual(len(cells), len(set(cells)))
@@ -0,0 +1,9 @@
+import random
+
+import numpy as np
+
+
+def random_points(count: int, lat_range=(-90, 90), lon_range=(-180, 180)) -> tuple[np.ndarray, np.ndarray]:
+    lats = np.array([random.uniform(*lat_range) for _ in range(count)])
+    lons = np.array([random.uniform(*lon_range) for _ in range(count)])
+    return lats, lons